@@ -0,0 +1,89 @@
+import math
+
+# Adaptive span testing: a QUEST-style Bayesian procedure over sequence length. A posterior over
+# the participant's span is kept on a grid; each trial uses the length whose outcome is expected
+# to shrink the posterior the most, and testing stops once the span is known to within
+# STOP_SD digits. This usually needs far fewer trials than stepping one level at a time.
+
+MIN_LENGTH = 2
+MAX_LENGTH = 15
+# Span grid: the span is the length recalled correctly half of the time
+SPAN_STEP = 0.1
+# Psychometric function: slope per digit, guessing rate and lapse rate
+SLOPE = 1.5
+GUESS = 0.0
+LAPSE = 0.03
+# Prior belief about the span (typical adult digit span is 7 +/- 2)
+PRIOR_MEAN = 6.5
+PRIOR_SD = 2.0
+# Stop once the posterior standard deviation is below STOP_SD, after at least MIN_TRIALS
+STOP_SD = 0.6
+MIN_TRIALS = 6
+MAX_TRIALS = 24
+
+
+# Function to get the probability of recalling a sequence of length correctly given a span
+def p_correct(length, span):
+    return GUESS + (1 - GUESS - LAPSE) / (1 + math.exp(SLOPE * (length - span)))
+
+
+class QuestProcedure:
+    def __init__(self, prior_mean=PRIOR_MEAN, prior_sd=PRIOR_SD):
+        count = int(round((MAX_LENGTH - MIN_LENGTH) / SPAN_STEP)) + 1
+        self.spans = [MIN_LENGTH + index * SPAN_STEP for index in range(count)]
+        self.lengths = list(range(MIN_LENGTH, MAX_LENGTH + 1))
+        # likelihoods[length][i] = p_correct(length, spans[i]), computed once
+        self.likelihoods = {length: [p_correct(length, span) for span in self.spans] for length in self.lengths}
+        weights = [math.exp(-0.5 * ((span - prior_mean) / prior_sd) ** 2) for span in self.spans]
+        total = sum(weights)
+        self.posterior = [weight / total for weight in weights]
+        self.trials = []  # (length, correct) in the order they were played
+        self._next_length = None
+
+    # Function to update the posterior with one trial's outcome
+    def record(self, length, correct):
+        self.trials.append((length, correct))
+        likelihood = self.likelihoods[length]
+        if correct:
+            weights = [p * l for p, l in zip(self.posterior, likelihood)]
+        else:
+            weights = [p * (1 - l) for p, l in zip(self.posterior, likelihood)]
+        total = sum(weights)
+        self.posterior = [weight / total for weight in weights]
+        self._next_length = None
+
+    # Posterior mean span
+    def estimate(self):
+        return sum(p * span for p, span in zip(self.posterior, self.spans))
+
+    def standard_deviation(self):
+        mean = self.estimate()
+        return math.sqrt(sum(p * (span - mean) ** 2 for p, span in zip(self.posterior, self.spans)))
+
+    @property
+    def finished(self):
+        if len(self.trials) >= MAX_TRIALS:
+            return True
+        return len(self.trials) >= MIN_TRIALS and self.standard_deviation() < STOP_SD
+
+    # Function to choose the length whose outcome minimizes the expected posterior entropy
+    def next_length(self):
+        if self._next_length is None:
+            best_entropy = None
+            for length in self.lengths:
+                likelihood = self.likelihoods[length]
+                correct = [p * l for p, l in zip(self.posterior, likelihood)]
+                p_yes = sum(correct)
+                wrong = [p - c for p, c in zip(self.posterior, correct)]
+                expected = p_yes * _entropy(correct, p_yes) + (1 - p_yes) * _entropy(wrong, 1 - p_yes)
+                if best_entropy is None or expected < best_entropy:
+                    best_entropy = expected
+                    self._next_length = length
+        return self._next_length
+
+
+# Function to get the entropy of unnormalized weights summing to total
+def _entropy(weights, total):
+    if total <= 0:
+        return 0.0
+    return -sum(w / total * math.log(w / total) for w in weights if w > 0)
@@ -0,0 +1,190 @@
+import argparse
+import json
+import sqlite3
+
+import numpy as np
+
+import game_core
+
+# Batch analytics over stored trials. Trials are loaded once into padded NumPy matrices
+# (one row per trial, one column per serial position, 0 = padding or no answer) and every
+# statistic is computed with array operations, so cohort-sized logs need no per-trial Python loop.
+
+
+class TrialData:
+    # adaptive marks the trials played in the adaptive mode and adaptive_spans holds each
+    # participant's mean stored span estimate from that mode (NaN for none)
+    def __init__(self, user_keys, users, sequences, responses, lengths, adaptive=None, adaptive_spans=None):
+        self.user_keys = user_keys  # user_keys[users[i]] is the participant of trial i
+        self.users = users
+        self.sequences = sequences
+        self.responses = responses
+        self.lengths = lengths
+        self.adaptive = np.zeros(len(lengths), dtype=bool) if adaptive is None else adaptive
+        self.adaptive_spans = np.full(len(user_keys), np.nan) if adaptive_spans is None else adaptive_spans
+
+    def __len__(self):
+        return len(self.lengths)
+
+    # Mask of the positions that belong to each trial's sequence
+    @property
+    def valid(self):
+        return np.arange(self.sequences.shape[1]) < self.lengths[:, None]
+
+    # Per-position correctness, False outside the sequence
+    @property
+    def position_correct(self):
+        return (self.sequences == self.responses) & self.valid
+
+    # Whole-trial correctness, the same rule as game_core.is_correct
+    @property
+    def trial_correct(self):
+        return (self.position_correct | ~self.valid).all(axis=1)
+
+
+# Function to turn digit strings into a padded uint8 matrix without looping over trials
+def _digit_matrix(strings, width):
+    # Anything outside ASCII (a typed "²", an Arabic-Indic digit) becomes "?" and counts as no answer
+    encoded = [string.encode("ascii", "replace") for string in strings]
+    raw = np.array(encoded, dtype=f"S{width}").view(np.uint8).reshape(len(strings), width)
+    digits = raw.astype(np.int16) - ord("0")
+    digits[(digits < 1) | (digits > 9)] = 0
+    return digits.astype(np.uint8)
+
+
+# Function to build TrialData from parallel lists of participant keys, sequence strings and responses.
+# adaptive optionally flags the adaptive-mode trials; adaptive_spans maps participant keys to
+# their mean stored span estimate.
+def from_records(user_keys, sequences, responses, adaptive=None, adaptive_spans=None):
+    unique_keys, users = np.unique(np.array(user_keys, dtype=object).astype(str), return_inverse=True)
+    lengths = np.fromiter((len(sequence) for sequence in sequences), dtype=np.int32, count=len(sequences))
+    width = int(lengths.max()) if len(lengths) else 1
+    adaptive_spans = adaptive_spans or {}
+    return TrialData(
+        list(unique_keys),
+        users.astype(np.int32),
+        _digit_matrix(sequences, width),
+        _digit_matrix([response or "" for response in responses], width),
+        lengths,
+        None if adaptive is None else np.array(adaptive, dtype=bool),
+        np.array([adaptive_spans.get(key, np.nan) for key in unique_keys], dtype=float),
+    )
+
+
+# Function to load every stored trial, optionally only from sessions started since a unix time or
+# only from one presentation mode ("visual" or "auditory"; spans differ between the two)
+def load_trials(database, since=None, presentation=None):
+    connection = sqlite3.connect(f"file:{database}?mode=ro", uri=True)
+    conditions = []
+    parameters = []
+    if since is not None:
+        conditions.append("s.started_at >= ?")
+        parameters.append(since)
+    if presentation is not None:
+        conditions.append("s.presentation = ?")
+        parameters.append(presentation)
+    # Adaptive sessions are the ones with a stored span estimate
+    sql = ("SELECT s.user_key, t.sequence, t.response, s.span_estimate IS NOT NULL "
+           "FROM trials t JOIN sessions s USING (session_id)")
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    # Only completed sessions: an aborted one's estimate rests on too few trials
+    span_sql = "SELECT s.user_key, AVG(s.span_estimate) FROM sessions s WHERE s.span_estimate IS NOT NULL AND s.completed = 1"
+    span_sql += "".join(f" AND {condition}" for condition in conditions)
+    rows = connection.execute(sql, parameters).fetchall()
+    adaptive_spans = dict(connection.execute(span_sql + " GROUP BY s.user_key", parameters).fetchall())
+    connection.close()
+    if not rows:
+        return from_records([], [], [])
+    user_keys, sequences, responses, adaptive = zip(*rows)
+    return from_records(user_keys, sequences, responses, adaptive, adaptive_spans)
+
+
+# Function to get the error rate at each serial position, per sequence length.
+# Returns (lengths, rates) where rates[i, p] is the error rate at position p for lengths[i] (NaN past the end).
+def serial_position_errors(data):
+    width = data.sequences.shape[1]
+    valid = data.valid
+    errors = valid & ~data.position_correct
+    length_index = np.broadcast_to(data.lengths[:, None], valid.shape)
+    position_index = np.broadcast_to(np.arange(width), valid.shape)
+    cells = (length_index * width + position_index)[valid]
+    totals = np.bincount(cells, minlength=(width + 1) * width).reshape(width + 1, width)
+    wrong = np.bincount(cells, weights=errors[valid], minlength=(width + 1) * width).reshape(width + 1, width)
+    lengths = np.flatnonzero(totals.sum(axis=1))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rates = wrong[lengths] / totals[lengths]
+    return lengths, rates
+
+
+# Function to count (shown digit, answered digit) pairs; confusion[i, j] is digit i+1 answered as j+1
+def confusion_matrix(data):
+    valid = data.valid & (data.responses > 0)
+    pairs = data.sequences[valid].astype(np.int32) * 10 + data.responses[valid]
+    return np.bincount(pairs, minlength=100).reshape(10, 10)[1:, 1:]
+
+
+# Function to get the proportion of correct trials for each participant at each sequence length.
+# Returns (lengths, proportions) with proportions[user, i] for lengths[i] (NaN where never tested).
+def proportion_correct_by_length(data):
+    max_length = int(data.lengths.max()) if len(data) else 0
+    cells = data.users.astype(np.int64) * (max_length + 1) + data.lengths
+    size = len(data.user_keys) * (max_length + 1)
+    totals = np.bincount(cells, minlength=size).reshape(len(data.user_keys), max_length + 1)
+    correct = np.bincount(cells, weights=data.trial_correct, minlength=size).reshape(len(data.user_keys), max_length + 1)
+    lengths = np.flatnonzero(totals.sum(axis=0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return lengths, correct[:, lengths] / totals[:, lengths]
+
+
+# Function to estimate each participant's memory span: the shortest length, minus one, plus the
+# summed proportion correct over the tested lengths (untested lengths count as failed). That only
+# holds for the level mode, which tests every length from START_LENGTH up, so adaptive trials are
+# left out and participants with adaptive sessions get their stored estimate instead (NaN when
+# there is neither).
+def span_estimates(data):
+    levels = ~data.adaptive
+    level_data = TrialData(data.user_keys, data.users[levels], data.sequences[levels], data.responses[levels], data.lengths[levels])
+    lengths, proportions = proportion_correct_by_length(level_data)
+    spans = np.full(len(data.user_keys), np.nan)
+    if len(lengths):
+        played = np.bincount(level_data.users, minlength=len(data.user_keys)) > 0
+        spans[played] = (game_core.START_LENGTH - 1) + np.nansum(proportions[played], axis=1)
+    return np.where(np.isnan(data.adaptive_spans), spans, data.adaptive_spans)
+
+
+# Function to get each value's percentile rank within the cohort (0-100)
+def percentiles(values):
+    ordered = np.sort(values)
+    return np.searchsorted(ordered, values, side="right") * 100.0 / len(values)
+
+
+# Function to compute the cohort dashboard numbers in one go
+def summarize(data):
+    spans = span_estimates(data)
+    known = ~np.isnan(spans)
+    lengths, rates = serial_position_errors(data)
+    return {
+        "trials": len(data),
+        "participants": len(data.user_keys),
+        "accuracy": float(data.trial_correct.mean()) if len(data) else None,
+        "span_mean": float(spans[known].mean()) if known.any() else None,
+        "span_percentiles": {
+            key: {"span": float(span), "percentile": float(rank)}
+            for key, span, rank in zip(np.array(data.user_keys)[known], spans[known], percentiles(spans[known]) if known.any() else [])
+        },
+        "serial_position_errors": {
+            int(length): [None if np.isnan(rate) else float(rate) for rate in row[:length]]
+            for length, row in zip(lengths, rates)
+        },
+        "confusion_matrix": confusion_matrix(data).tolist(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cohort analytics over the results store.")
+    parser.add_argument("database", nargs="?", default="results.db")
+    parser.add_argument("--since", type=float, help="only sessions started at or after this unix time")
+    parser.add_argument("--presentation", choices=("visual", "auditory"), help="only sessions with this presentation mode")
+    args = parser.parse_args()
+    print(json.dumps(summarize(load_trials(args.database, args.since, args.presentation)), indent=2))
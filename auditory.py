@@ -0,0 +1,162 @@
+import array
+import io
+import math
+import os
+import wave
+
+import pygame
+
+import presentation
+
+# Auditory digit presentation. Each digit's audio is decoded once into memory; for every trial
+# the digits are laid out in a single buffer at their exact sample offsets (one onset every
+# DIGIT_DURATION + BLANK_DURATION), so the spacing between digits is sample-accurate and only
+# the start of the trial has to be scheduled, on the presentation clock.
+#
+# The buffer is played as the mixer's music stream, whose playback position pygame keeps from
+# the samples actually handed to the audio device. At every digit onset and offset the game
+# reads that position, which gives when the stream really started; the one buffer the device
+# holds before the samples are heard is added as an estimate.
+
+MIXER_FREQUENCY = 44100
+MIXER_BUFFER = 256  # Samples per mixer buffer; small for low output latency (about 6 ms)
+
+# Buffer size in samples of the mixer as init_mixer() opened it (pygame cannot report it)
+mixer_buffer = None
+
+# Spoken digits are read from 1.wav ... 9.wav here. Missing files are rendered once with the
+# optional pyttsx3 text-to-speech package; without it a distinct tone stands in for each digit.
+DIGIT_SOUND_DIR = "digit_sounds"
+
+TONE_DURATION = 0.35
+TONE_FADE = 0.01
+
+
+# Function to open the mixer with a small buffer. A mixer opened elsewhere (e.g. by pygame.init())
+# is reopened, since its buffer size, and so the output latency, cannot be read back.
+def init_mixer():
+    global mixer_buffer
+    if pygame.mixer.get_init() and mixer_buffer is not None:
+        return
+    pygame.mixer.quit()
+    pygame.mixer.pre_init(MIXER_FREQUENCY, -16, 1, MIXER_BUFFER)
+    pygame.mixer.init()
+    mixer_buffer = MIXER_BUFFER
+
+
+# Function to render a spoken digit to path with pyttsx3; returns False if that is not possible
+def _speak_to_file(digit, path):
+    try:
+        import pyttsx3
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)  # Only once there is something to write
+        engine = pyttsx3.init()
+        engine.save_to_file(str(digit), path)
+        engine.runAndWait()
+    except (ImportError, RuntimeError, OSError):
+        return False
+    return os.path.exists(path)
+
+
+# Function to synthesize a short tone for digit in the mixer's format
+def _tone(digit):
+    frequency, size, channels = pygame.mixer.get_init()
+    pitch = 440.0 * 2 ** ((digit - 5) / 6)  # Half an octave apart, so digits are easy to tell apart
+    count = int(TONE_DURATION * frequency)
+    fade = int(TONE_FADE * frequency)
+    samples = array.array("h")
+    for index in range(count):
+        envelope = min(1.0, index / fade, (count - index) / fade)
+        value = int(12000 * envelope * math.sin(2 * math.pi * pitch * index / frequency))
+        samples.extend([value] * channels)
+    return pygame.mixer.Sound(buffer=samples.tobytes())
+
+
+# Function to get every digit's audio as raw sample bytes in the mixer's format
+def load_digit_samples(directory=DIGIT_SOUND_DIR):
+    samples = {}
+    for digit in range(1, 10):
+        path = os.path.join(directory, f"{digit}.wav")
+        if not os.path.exists(path):
+            _speak_to_file(digit, path)
+        sound = pygame.mixer.Sound(path) if os.path.exists(path) else _tone(digit)
+        samples[digit] = sound.get_raw()
+    return samples
+
+
+# Plays the digits of a trial and logs their onsets in the same form as the visual presentation
+class AuditoryPresenter:
+    # log is the presentation.PresentationLog playback times are written to (a new one by default)
+    def __init__(self, directory=DIGIT_SOUND_DIR, log=None):
+        init_mixer()
+        frequency, size, channels = pygame.mixer.get_init()
+        self.frequency = frequency
+        self.channels = channels
+        self.sample_bytes = abs(size) // 8
+        self.frame_bytes = channels * self.sample_bytes
+        self.samples = load_digit_samples(directory)
+        # Samples leave the mixer one buffer before they are heard
+        self.output_latency = mixer_buffer / frequency
+        self.log = log if log is not None else presentation.PresentationLog()
+        self.log.timing = (f"mixer playback position read at each onset and offset, plus an estimated "
+                           f"{self.output_latency * 1000:.1f} ms output latency ({mixer_buffer}-sample buffer)")
+        self._sequence = None
+        self._index = None  # Digit whose sound is playing, until its offset is logged
+
+    # Function to lay out the sequence in one buffer with an onset every spacing seconds
+    def prepare(self, sequence, spacing):
+        step = round(spacing * self.frequency) * self.frame_bytes
+        # One spacing of silence at the end keeps the stream, and its position, running past the last offset
+        buffer = bytearray(step * (len(sequence) + 1))
+        for index, digit in enumerate(sequence):
+            raw = self.samples[digit][:step]
+            buffer[index * step:index * step + len(raw)] = raw
+        self.spacing = step // self.frame_bytes / self.frequency
+        stream = io.BytesIO()
+        with wave.open(stream, "wb") as wav:
+            wav.setnchannels(self.channels)
+            wav.setsampwidth(self.sample_bytes)
+            wav.setframerate(self.frequency)
+            wav.writeframes(bytes(buffer))
+        stream.seek(0)
+        pygame.mixer.music.load(stream, "wav")
+        self._sequence = sequence
+
+    # Function to start the prepared sequence at scheduled (a presentation.clock() value) and log
+    # the first digit's onset
+    def play(self, level, trial, scheduled):
+        self._level, self._trial, self._scheduled = level, trial, scheduled
+        presentation.wait_until(scheduled)
+        pygame.mixer.music.play()
+        self.digit_on(0)
+
+    # Function to get when the stream started playing, from its current position; None once it stopped
+    def _stream_start(self):
+        position = pygame.mixer.music.get_pos()
+        if position < 0:
+            return None
+        return presentation.clock() - position / 1000
+
+    def _duration(self, index):
+        return min(len(self.samples[self._sequence[index]]) // self.frame_bytes / self.frequency, self.spacing)
+
+    # Function to log the onset of digit index of the playing sequence, called when it is due
+    def digit_on(self, index):
+        start = self._stream_start()
+        if start is None:
+            return
+        offset = index * self.spacing
+        self._index = index
+        self.log.digit_on(self._level, self._trial, index, self._sequence[index], self._scheduled + offset,
+                          start + offset + self.output_latency)
+
+    # Function to log the end of the current digit's sound, called once it is over
+    def digit_off(self):
+        start = self._stream_start()
+        if start is None or self._index is None:
+            return
+        end = self._index * self.spacing + self._duration(self._index)
+        self.log.digit_off(self._scheduled + end, start + end + self.output_latency)
+        self._index = None
+
+    def stop(self):
+        pygame.mixer.music.stop()
@@ -0,0 +1,371 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import threading
+import time
+
+# Benchmarks for the rendering, input and presentation paths. They run headless on the dummy
+# SDL drivers and write a JSON file so results can be compared between revisions:
+#   python benchmarks.py --output before.json
+#   python benchmarks.py --output after.json --compare before.json
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+import speech_recognition as sr
+
+import circuit_breaker
+import game_flow
+import memory_test
+import mock_speech_service
+import render_cache
+import speech_backends
+import speech_service
+
+memory_test.init_display()
+
+
+# Function to summarize a list of timings in milliseconds
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "n": len(samples),
+        "mean_ms": statistics.fmean(samples),
+        "median_ms": statistics.median(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "min_ms": samples[0],
+        "max_ms": samples[-1],
+    }
+
+
+# Function to time fn() repeatedly, in milliseconds
+def time_calls(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return summarize(samples)
+
+
+# Function to time a screen's draw function, both repainting everything and with nothing changed
+def time_screen(draw, repeat):
+    def full_frame():
+        memory_test.renderer.invalidate()
+        draw()
+
+    draw()
+    return {"full_redraw": time_calls(full_frame, repeat), "unchanged": time_calls(draw, repeat)}
+
+
+# Function to benchmark the frame time of each screen
+def bench_screens(repeat):
+    start_button = pygame.Rect(memory_test.screen_width // 2 - 100, memory_test.screen_height - 150, 200, 50)
+    flow = game_flow.GameFlow(memory_test.generate_sequence, 0.0)
+    sequence_display = lambda: memory_test.draw_flow(flow)
+    flow_for_result = game_flow.GameFlow(memory_test.generate_sequence, 0.0)
+    flow_for_result.update(flow_for_result.deadline + 10)
+    flow_for_result.submit_input("123", 0.0)
+    result_screen = lambda: memory_test.draw_flow(flow_for_result)
+
+    return {
+        "start_screen": time_screen(lambda: memory_test.draw_start_screen(start_button), repeat),
+        "sequence_display": time_screen(sequence_display, repeat),
+        "typing_prompt": time_screen(lambda: memory_test.draw_typing_prompt(3, "12"), repeat),
+        "result_screen": time_screen(result_screen, repeat),
+    }
+
+
+# Function to compare the gradient background (memory_test.py) with the flat fill (memoer.py)
+def bench_backgrounds(repeat):
+    screen = memory_test.screen
+    size = screen.get_size()
+    return {
+        "gradient_line_by_line": time_calls(lambda: render_cache._build_gradient(size, memory_test.LIGHT_BLUE), max(1, repeat // 10)),
+        "gradient_cached": time_calls(memory_test.draw_gradient_background, repeat),
+        "flat_fill": time_calls(lambda: screen.fill(memory_test.LIGHT_BLUE), repeat),
+        "flat_cached": time_calls(lambda: screen.blit(render_cache.get_background(screen, "flat", memory_test.LIGHT_BLUE), (0, 0)), repeat),
+    }
+
+
+# Function to measure the time from posting a keystroke to the display update that shows it
+def bench_typing_latency(keystrokes):
+    update_times = []
+    original_update = pygame.display.update
+    original_flip = pygame.display.flip
+
+    def timed_update(*args):
+        original_update(*args)
+        update_times.append(time.perf_counter())
+
+    def timed_flip():
+        original_flip()
+        update_times.append(time.perf_counter())
+
+    latencies = []
+
+    def type_keys():
+        time.sleep(0.05)
+        for index in range(keystrokes):
+            if index % 2 == 0:
+                event = pygame.event.Event(pygame.KEYDOWN, key=pygame.K_1, unicode="1")
+            else:
+                event = pygame.event.Event(pygame.KEYDOWN, key=pygame.K_BACKSPACE, unicode="")
+            seen = len(update_times)
+            posted = time.perf_counter()
+            pygame.event.post(event)
+            while len(update_times) == seen:
+                time.sleep(0.0002)
+            latencies.append((update_times[seen] - posted) * 1000)
+        for key, unicode in ((pygame.K_1, "1"), (pygame.K_2, "2"), (pygame.K_3, "3"), (pygame.K_RETURN, "\r")):
+            pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key, unicode=unicode))
+
+    pygame.display.update = timed_update
+    pygame.display.flip = timed_flip
+    try:
+        typist = threading.Thread(target=type_keys)
+        typist.start()
+        memory_test.get_player_typing_input(3)
+        typist.join()
+    finally:
+        pygame.display.update = original_update
+        pygame.display.flip = original_flip
+    return summarize(latencies)
+
+
+# Answers from a fixed script instead of a microphone and a network recognizer
+class StubBackend:
+    name = "stub"
+    needs_microphone = False
+
+    def __init__(self, answer):
+        self.answer = answer
+
+    def capture(self):
+        return sr.AudioData(b"", 16000, 2)
+
+    def recognize(self, audio):
+        return self.answer()
+
+
+# Function to play one game through memory_test() with a stubbed recognizer.
+# answer(sequences) gives the spoken text for the latest sequence; durations overrides the
+# game_flow phase durations. Returns (sequences shown, wall seconds, cpu seconds).
+def play_stubbed_game(answer, durations):
+    saved_durations = {name: getattr(game_flow, name) for name in durations}
+    sequences = []
+    original_generate = memory_test.generate_sequence
+    original_speech = memory_test.speech
+    original_thread = memory_test.speech_thread
+
+    def generate(length):
+        sequences.append(original_generate(length))
+        return sequences[-1]
+
+    for name, value in durations.items():
+        setattr(game_flow, name, value)
+    memory_test.generate_sequence = generate
+    memory_test.speech = speech_service.SpeechService(sr.Recognizer(), StubBackend(lambda: answer(sequences)), on_result=memory_test.post_speech_result)
+    memory_test.speech_thread = None
+    try:
+        wall_started = time.perf_counter()
+        cpu_started = time.process_time()
+        memory_test.memory_test({})
+        wall = time.perf_counter() - wall_started
+        cpu = time.process_time() - cpu_started
+    finally:
+        for name, value in saved_durations.items():
+            setattr(game_flow, name, value)
+        memory_test.generate_sequence = original_generate
+        memory_test.speech = original_speech
+        memory_test.speech_thread = original_thread
+    return sequences, wall, cpu
+
+
+# Function to measure the cost of whole trials with no presentation or feedback pauses
+def bench_trials(trials):
+    def answer(sequences):
+        # Correct answers until enough trials have run, then wrong ones to end the game
+        if len(sequences) < trials:
+            return " ".join(map(str, sequences[-1]))
+        return "0" * len(sequences[-1])
+
+    no_pauses = {name: 0.0 for name in dir(game_flow) if name.endswith("_DURATION")}
+    sequences, wall, cpu = play_stubbed_game(answer, no_pauses)
+    return {
+        "trials": len(sequences),
+        "wall_ms_per_trial": wall * 1000 / len(sequences),
+        "cpu_ms_per_trial": cpu * 1000 / len(sequences),
+    }
+
+
+# Function to measure digit flip-on/flip-off accuracy over one short game (three wrong trials)
+def bench_presentation():
+    durations = {name: 0.0 for name in dir(game_flow) if name.endswith("_DURATION")}
+    durations.update(DIGIT_DURATION=0.1, BLANK_DURATION=0.05)
+    play_stubbed_game(lambda sequences: "0" * len(sequences[-1]), durations)
+    return memory_test.presentation_log.statistics()
+
+
+# Offline stand-in for a recognizer: answers after a random delay, sometimes mishears one digit
+# or fails. delay(rng) gives the latency in seconds.
+class DelayedBackend:
+    needs_microphone = False
+
+    def __init__(self, name, delay, mishear_rate=0.0, error_rate=0.0, seed=0):
+        self.name = name
+        self.delay = delay
+        self.mishear_rate = mishear_rate
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.transcript = None  # What the player "said"; set before each recognition
+
+    def recognize(self, audio):
+        delay, roll = self.delay(self.rng), self.rng.random()
+        time.sleep(delay)
+        if roll < self.error_rate:
+            raise sr.RequestError(f"{self.name} unavailable")
+        if roll < self.error_rate + self.mishear_rate:
+            return self.transcript[:-1]  # Lost the last digit
+        return self.transcript
+
+
+# Function to compare one network-like recognizer on its own against racing it with a slower
+# but steadier local one; delays are scaled down by 10 to keep the run short
+def bench_recognition_race(answers):
+    network = DelayedBackend("network", lambda rng: 0.04 if rng.random() < 0.9 else 0.25, mishear_rate=0.05, error_rate=0.05, seed=1)
+    local = DelayedBackend("local", lambda rng: rng.uniform(0.05, 0.07), mishear_rate=0.15, seed=2)
+    race = speech_backends.RacingBackend([network, local])
+    audio = sr.AudioData(b"", 16000, 2)
+    rng = random.Random(0)
+    results = {}
+    for label, backend in (("single", network), ("race", race)):
+        latencies = []
+        failures = 0
+        wins = {}
+        for _ in range(answers):
+            network.transcript = local.transcript = " ".join(str(rng.randint(1, 9)) for _ in range(5))
+            started = time.perf_counter()
+            try:
+                text = backend.recognize_expected(audio, 5) if backend is race else backend.recognize(audio)
+                failures += len(text.split()) != 5
+            except sr.RequestError:
+                failures += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+            if backend is race:
+                wins[race.last_race["winner"]] = wins.get(race.last_race["winner"], 0) + 1
+        results[label] = dict(summarize(latencies), failure_rate=failures / answers)
+        if wins:
+            results[label]["wins"] = wins
+    return results
+
+
+# Sends silence instead of microphone audio to a network backend
+class SilenceBackend:
+    needs_microphone = False
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.name = inner.name
+
+    def capture(self):
+        return speech_service.PROBE_AUDIO
+
+    def recognize(self, audio):
+        return self.inner.recognize(audio)
+
+
+# Function to measure answer latency through the speech service while the mock speech service
+# goes down (every request hangs) for the middle third of the answers, with and without the
+# circuit breaker. Also counts the connections opened, which stay at one while requests reuse it.
+def bench_speech_outage(answers):
+    results = {}
+    for label, threshold in (("no_breaker", 0), ("breaker", 3)):
+        mock = mock_speech_service.MockSpeechService(latency=0.02, hang_seconds=1.0, seed=0)
+        url = mock.start()
+        backend = speech_backends.GoogleBackend(sr.Recognizer(), endpoint=url, timeout=0.25)
+        answered = threading.Event()
+        service = speech_service.SpeechService(sr.Recognizer(), SilenceBackend(backend), on_result=answered.set)
+        service.breaker = circuit_breaker.CircuitBreaker(service._probe, failure_threshold=threshold, probe_interval=0.1)
+        latencies = {"healthy": [], "outage": []}
+        statuses = {}
+        for index in range(answers):
+            outage = answers // 3 <= index < 2 * answers // 3
+            mock.hang_rate = 1.0 if outage else 0.0
+            if index == 2 * answers // 3:
+                time.sleep(0.3)  # Give the probe a chance to see the recovery
+            answered.clear()
+            started = time.perf_counter()
+            request_id = service.listen()
+            answered.wait()
+            status, _ = service.poll(request_id)
+            latencies["outage" if outage else "healthy"].append((time.perf_counter() - started) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+        service.stop()
+        mock.hang_rate = 0.0
+        results[label] = {
+            "healthy": summarize(latencies["healthy"]),
+            "outage": summarize(latencies["outage"]),
+            "statuses": statuses,
+            "connections": mock.connections,
+            "requests": mock.requests,
+        }
+        mock.stop()
+    return results
+
+
+# Function to get the current git revision, if any
+def current_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Function to print the ratio of every mean timing against an earlier results file
+def compare(results, baseline, path=""):
+    for key, value in results.items():
+        old = baseline.get(key) if isinstance(baseline, dict) else None
+        if isinstance(value, dict):
+            compare(value, old or {}, f"{path}{key}.")
+        elif isinstance(old, (int, float)) and old and (key == "mean_ms" or key.endswith("_per_trial")):
+            print(f"{path}{key}: {old:.3f} -> {value:.3f} ({value / old:.2f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the memory test rendering, input and presentation paths.")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--keystrokes", type=int, default=200)
+    parser.add_argument("--trials", type=int, default=30)
+    parser.add_argument("--answers", type=int, default=200, help="spoken answers for the recognition race and outage benchmarks")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    results = {
+        "revision": current_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "display_size": list(memory_test.screen.get_size()),
+        "screens": bench_screens(args.repeat),
+        "backgrounds": bench_backgrounds(args.repeat),
+        "typing_latency": bench_typing_latency(args.keystrokes),
+        "trial": bench_trials(args.trials),
+        "presentation": bench_presentation(),
+        "recognition_race": bench_recognition_race(args.answers),
+        "speech_outage": bench_speech_outage(args.answers),
+    }
+
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            compare(results, json.load(baseline))
+    pygame.quit()
@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+
+import metrics
+
+# Circuit breaker for the speech service. After FAILURE_THRESHOLD consecutive service failures
+# the circuit opens: the station stops sending answers to the recognizer and goes straight to
+# typing input. While open, a background thread calls probe() every PROBE_INTERVAL seconds;
+# the first probe that succeeds closes the circuit again, so voice input comes back without
+# a player ever waiting on a dead service.
+#
+#   MEMORY_TEST_BREAKER_FAILURES=3         consecutive failures that open the circuit (0 disables it)
+#   MEMORY_TEST_BREAKER_PROBE_INTERVAL=15  seconds between recovery probes
+
+FAILURE_THRESHOLD = 3
+PROBE_INTERVAL = 15.0
+
+CLOSED = "closed"
+OPEN = "open"
+
+
+class CircuitBreaker:
+    # probe() returns True when the service answered; on_change(state), if given, is called
+    # from whichever thread changed the state
+    def __init__(self, probe, failure_threshold=FAILURE_THRESHOLD, probe_interval=PROBE_INTERVAL, on_change=None):
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.on_change = on_change
+        self.state = CLOSED
+        self.failures = 0  # Consecutive failures while closed
+        self.opened_at = None
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._closed.set()
+
+    @property
+    def is_open(self):
+        return self.state == OPEN
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == OPEN or self.failure_threshold <= 0 or self.failures < self.failure_threshold:
+                return
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self._closed.clear()
+        threading.Thread(target=self._probe_until_closed, name="speech-probe", daemon=True).start()
+        self._changed(OPEN)
+
+    def _probe_until_closed(self):
+        while not self._closed.wait(self.probe_interval):
+            try:
+                healthy = self.probe()
+            except Exception:
+                healthy = False  # A probe must never take the thread down with it
+            if healthy:
+                with self._lock:
+                    self.state = CLOSED
+                    self.failures = 0
+                    self.opened_at = None
+                    self._closed.set()
+                self._changed(CLOSED)
+
+    def _changed(self, state):
+        metrics.increment("memory_test_speech_circuit_total", ("state", state))
+        if self.on_change is not None:
+            self.on_change(state)
+
+
+# Function to build the breaker configured for the station around probe
+def breaker_from_environment(probe):
+    return CircuitBreaker(
+        probe,
+        failure_threshold=int(os.environ.get("MEMORY_TEST_BREAKER_FAILURES", FAILURE_THRESHOLD)),
+        probe_interval=float(os.environ.get("MEMORY_TEST_BREAKER_PROBE_INTERVAL", PROBE_INTERVAL)),
+    )
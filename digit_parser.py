@@ -0,0 +1,92 @@
+import re
+
+# Turns recognizer transcripts into digit strings. Recognizers write spoken digits as figures,
+# number words, homophones ("to", "for", "ate", "oh") or compound numbers ("twenty three",
+# "one hundred and five"), and a sequence is often merged into one number ("123"); all of them
+# come out as plain digits here.
+
+UNITS = {
+    "zero": 0, "oh": 0, "o": 0, "nought": 0, "naught": 0, "nil": 0,
+    "one": 1, "won": 1,
+    "two": 2, "to": 2, "too": 2,
+    "three": 3, "tree": 3, "free": 3,
+    "four": 4, "for": 4, "fore": 4,
+    "five": 5,
+    "six": 6, "sicks": 6,
+    "seven": 7,
+    "eight": 8, "ate": 8,
+    "nine": 9, "nein": 9,
+}
+TEENS = {
+    "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14,
+    "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19,
+}
+TENS = {
+    "twenty": 20, "thirty": 30, "forty": 40, "fourty": 40, "fifty": 50,
+    "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90,
+}
+REPEATS = {"double": 2, "triple": 3}
+
+
+# Function to read a number below 100 starting at tokens[index]; returns (text, next index) or None
+def _below_hundred(tokens, index):
+    if index >= len(tokens):
+        return None
+    token = tokens[index]
+    if token in TENS:
+        if index + 1 < len(tokens) and tokens[index + 1] in UNITS and UNITS[tokens[index + 1]]:
+            return str(TENS[token] + UNITS[tokens[index + 1]]), index + 2
+        return str(TENS[token]), index + 1
+    if token in TEENS:
+        return str(TEENS[token]), index + 1
+    if token in UNITS:
+        return str(UNITS[token]), index + 1
+    return None
+
+
+# Function to get the digits spoken in text, in order, as a string
+def parse_digits(text):
+    tokens = re.findall(r"[a-z]+|\d", text.lower())
+    digits = []
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        if token.isdigit():
+            digits.append(token)
+            index += 1
+            continue
+
+        # "double five" -> 55
+        if token in REPEATS and index + 1 < len(tokens) and tokens[index + 1] in UNITS:
+            digits.append(str(UNITS[tokens[index + 1]]) * REPEATS[token])
+            index += 2
+            continue
+
+        number = _below_hundred(tokens, index)
+        if number is None:
+            index += 1  # Filler or an unrelated word
+            continue
+        value, index = number
+
+        # "one hundred and five" -> 105, "three hundred" -> 300
+        if index < len(tokens) and tokens[index] == "hundred" and len(value) == 1:
+            index += 1
+            if index < len(tokens) and tokens[index] == "and":
+                index += 1
+            rest = _below_hundred(tokens, index)
+            if rest is None:
+                value += "00"
+            else:
+                value += rest[0].zfill(2)
+                index = rest[1]
+        digits.append(value)
+    return "".join(digits)
+
+
+# Function to choose among a recognizer's alternatives (best first) the first transcript that
+# holds exactly length digits; falls back to the top alternative
+def best_alternative(alternatives, length):
+    for transcript in alternatives:
+        if len(parse_digits(transcript)) == length:
+            return transcript
+    return alternatives[0]
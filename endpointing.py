@@ -0,0 +1,131 @@
+import audioop
+import math
+
+import speech_recognition as sr
+
+# Streaming capture for spoken digit answers. Microphone chunks go straight into a ring buffer
+# that is allocated once per stream, and an energy detector counts the spoken words as they
+# arrive: once the expected number of digits has been heard and the speaker pauses briefly,
+# capture ends, instead of waiting out the recognizer's full pause_threshold.
+
+# Longest answer kept, in seconds; older audio is overwritten
+MAX_ANSWER_DURATION = 15.0
+# Silence kept before the first word so its onset is not clipped
+PRE_ROLL = 0.2
+# A word ends after this much silence; shorter dips belong to the same word
+WORD_GAP = 0.12
+# Voiced stretches shorter than this are clicks or breaths, not words
+MIN_WORD_DURATION = 0.08
+# Silence that ends capture once every expected digit has been spoken
+END_SILENCE = 0.25
+# Silence that ends capture when fewer words than expected were heard
+FALLBACK_SILENCE = 0.8
+# Give up if nobody starts speaking within this many seconds
+START_TIMEOUT = 8.0
+
+
+# Fixed-size circular byte buffer; writing never allocates and old audio is overwritten
+class AudioRingBuffer:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self.clear()
+
+    def clear(self):
+        self.end = 0  # Where the next byte goes
+        self.size = 0  # Bytes currently held
+        self.written = 0  # Bytes written since clear(), including overwritten ones
+
+    def write(self, chunk):
+        chunk = memoryview(chunk)
+        self.written += len(chunk)
+        if len(chunk) > self.capacity:
+            chunk = chunk[-self.capacity:]
+        first = min(len(chunk), self.capacity - self.end)
+        self._view[self.end:self.end + first] = chunk[:first]
+        self._view[:len(chunk) - first] = chunk[first:]
+        self.end = (self.end + len(chunk)) % self.capacity
+        self.size = min(self.capacity, self.size + len(chunk))
+
+    # Function to copy out the audio from absolute offset start (as counted by written) to the end
+    def read_from(self, start):
+        length = min(self.size, self.written - max(0, start))
+        begin = (self.end - length) % self.capacity
+        if begin + length <= self.capacity:
+            return bytes(self._view[begin:begin + length])
+        return b"".join((self._view[begin:], self._view[:self.end]))
+
+
+# Counts words from per-chunk energy and decides when an answer is complete
+class EndpointDetector:
+    def __init__(self, expected_words, seconds_per_chunk, energy_threshold):
+        self.expected_words = expected_words
+        self.energy_threshold = energy_threshold
+        self._gap_chunks = max(1, math.ceil(WORD_GAP / seconds_per_chunk))
+        self._min_word_chunks = max(1, math.ceil(MIN_WORD_DURATION / seconds_per_chunk))
+        self._end_chunks = max(1, math.ceil(END_SILENCE / seconds_per_chunk))
+        self._fallback_chunks = max(1, math.ceil(FALLBACK_SILENCE / seconds_per_chunk))
+        self.words = 0
+        self.speech_started = None  # Index of the first voiced chunk
+        self._chunks = 0
+        self._voiced = 0  # Voiced chunks in the current word
+        self._silent = 0  # Silent chunks since the last voiced one
+
+    # Function to feed one chunk's RMS energy; returns True when capture should stop
+    def update(self, energy):
+        self._chunks += 1
+        if energy > self.energy_threshold:
+            if self.speech_started is None:
+                self.speech_started = self._chunks - 1
+            self._voiced += 1
+            self._silent = 0
+            return False
+
+        self._silent += 1
+        if self._silent == self._gap_chunks and self._voiced:
+            if self._voiced >= self._min_word_chunks:
+                self.words += 1
+            self._voiced = 0
+        if self.speech_started is None:
+            return False
+        if self.words >= self.expected_words and self._silent >= self._end_chunks:
+            return True
+        return self._silent >= self._fallback_chunks
+
+
+# Function to capture one answer of expected_words words from an open sr.Microphone source.
+# ring is an AudioRingBuffer reused between answers. Raises sr.WaitTimeoutError if nobody speaks.
+def listen_for_digits(source, recognizer, ring, expected_words):
+    seconds_per_chunk = source.CHUNK / source.SAMPLE_RATE
+    chunk_bytes = source.CHUNK * source.SAMPLE_WIDTH
+    detector = EndpointDetector(expected_words, seconds_per_chunk, recognizer.energy_threshold)
+    start_timeout_chunks = math.ceil(START_TIMEOUT / seconds_per_chunk)
+    max_chunks = ring.capacity // chunk_bytes
+    ring.clear()
+
+    chunks = 0
+    while True:
+        chunk = source.stream.read(source.CHUNK)
+        if not chunk:
+            break
+        ring.write(chunk)
+        chunks += 1
+        if detector.update(audioop.rms(chunk, source.SAMPLE_WIDTH)):
+            break
+        if detector.speech_started is None:
+            if chunks >= start_timeout_chunks:
+                raise sr.WaitTimeoutError("listening timed out while waiting for speech")
+        elif chunks - detector.speech_started >= max_chunks:
+            break
+
+    pre_roll = math.ceil(PRE_ROLL / seconds_per_chunk)
+    start = max(0, (detector.speech_started or 0) - pre_roll) * chunk_bytes
+    return sr.AudioData(ring.read_from(start), source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+
+
+# Function to allocate the ring buffer for a source's sample format
+def ring_for(source):
+    chunk_bytes = source.CHUNK * source.SAMPLE_WIDTH
+    chunks = math.ceil(MAX_ANSWER_DURATION * source.SAMPLE_RATE / source.CHUNK)
+    return AudioRingBuffer(chunks * chunk_bytes)
@@ -0,0 +1,38 @@
+import random
+
+# Core rules of the memory test. No pygame here, so the rules can be reused by the window,
+# the headless simulator and any other front-end.
+
+START_LENGTH = 3  # Sequence length at level 1
+TRIALS_PER_LEVEL = 3
+PASS_MARK = 2  # Correct trials needed to advance to the next level
+
+
+# Function to generate a random sequence of numbers
+def generate_sequence(length, rng=random):
+    return [rng.randint(1, 9) for _ in range(length)]
+
+
+# Function to get the sequence length for a level
+def sequence_length(level):
+    return START_LENGTH + (level - 1)
+
+
+# Function to get the level whose sequences have the given length
+def level_for_length(length):
+    return length - START_LENGTH + 1
+
+
+# Function to count digits the player got right in the right position
+def count_correct(player_input, sequence):
+    return sum(1 for i, j in zip(player_input, sequence) if i == str(j))
+
+
+# Function to check whether an answer reproduces the whole sequence
+def is_correct(player_input, sequence):
+    return count_correct(player_input, sequence) == len(sequence)
+
+
+# Function to check whether a finished level lets the player advance
+def level_passed(correct_attempts):
+    return correct_attempts >= PASS_MARK
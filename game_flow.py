@@ -0,0 +1,148 @@
+# Timed state machine for the level/trial flow of the memory test.
+# It has no pygame dependency: the caller feeds it the current time and the player's answers,
+# so the same flow runs in the pygame window, headless, or faster than real time.
+# The scoring and level rules themselves live in game_core. With an adaptive procedure
+# (adaptive.QuestProcedure) the procedure picks every sequence length instead of the levels,
+# and the game ends once it has estimated the span.
+
+import game_core
+
+# Phases of the game flow
+PRESENT_DIGIT = "present_digit"
+BLANK = "blank"
+COLLECT_INPUT = "collect_input"
+FEEDBACK = "feedback"
+LEVEL_COMPLETE = "level_complete"
+GAME_OVER = "game_over"
+FINISHED = "finished"
+
+# Phase durations in seconds
+DIGIT_DURATION = 1.0
+BLANK_DURATION = 0.5
+FEEDBACK_DURATION = 2.0
+LEVEL_COMPLETE_DURATION = 3.0
+GAME_OVER_DURATION = 5.0
+
+
+class GameFlow:
+    def __init__(self, generate_sequence, now, procedure=None):
+        self.generate_sequence = generate_sequence
+        self.procedure = procedure
+        self.level = 1  # Start at level 1
+        if procedure is not None:
+            self.level = game_core.level_for_length(procedure.next_length())
+        self.score = 0  # Track the score
+        self.player_input = None
+        self.last_correct = False
+        self.aborted = False
+        self._start_level()
+        self._start_trial(now)
+
+    @property
+    def sequence_length(self):
+        return game_core.sequence_length(self.level)
+
+    # The adaptive procedure's span estimate, or None when playing by levels or before the first
+    # trial is scored (the estimate would only be the prior)
+    @property
+    def span_estimate(self):
+        return None if self.procedure is None or not self.procedure.trials else self.procedure.estimate()
+
+    @property
+    def span_sd(self):
+        return None if self.procedure is None or not self.procedure.trials else self.procedure.standard_deviation()
+
+    @property
+    def current_digit(self):
+        return self.sequence[self.digit_index]
+
+    def _start_level(self):
+        self.correct_attempts = 0  # Track correct attempts per level
+        self.total_attempts = 0  # Track total attempts per level
+        self.remaining_chances = game_core.TRIALS_PER_LEVEL  # Player starts with 3 chances per level
+
+    def _start_trial(self, start):
+        self.sequence = self.generate_sequence(self.sequence_length)
+        self.digit_index = 0
+        self.player_input = None
+        self._enter(PRESENT_DIGIT, start, DIGIT_DURATION)
+
+    def _enter(self, phase, start, duration=None):
+        self.phase = phase
+        # Deadlines chain from the previous deadline rather than from "now", so a late wake-up
+        # does not push the rest of the sequence back
+        self.deadline = None if duration is None else start + duration
+
+    # Seconds until the current phase ends, or None while waiting for the player
+    def time_until_deadline(self, now):
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - now)
+
+    # Function to advance through every phase whose deadline has passed; returns True on a phase change
+    def update(self, now):
+        changed = False
+        while self.deadline is not None and now >= self.deadline:
+            self._advance(self.deadline)
+            changed = True
+        return changed
+
+    def _advance(self, start):
+        if self.phase == PRESENT_DIGIT:
+            self._enter(BLANK, start, BLANK_DURATION)
+        elif self.phase == BLANK:
+            self.digit_index += 1
+            if self.digit_index < self.sequence_length:
+                self._enter(PRESENT_DIGIT, start, DIGIT_DURATION)
+            else:
+                self._enter(COLLECT_INPUT, start)
+        elif self.phase == FEEDBACK:
+            self.total_attempts += 1
+            if self.procedure is not None:
+                self.procedure.record(self.sequence_length, self.last_correct)
+                if self.procedure.finished:
+                    self._enter(GAME_OVER, start, GAME_OVER_DURATION)
+                else:
+                    self.level = game_core.level_for_length(self.procedure.next_length())
+                    self._start_trial(start)
+            elif self.total_attempts == game_core.TRIALS_PER_LEVEL and game_core.level_passed(self.correct_attempts):
+                self.level += 1
+                self._enter(LEVEL_COMPLETE, start, LEVEL_COMPLETE_DURATION)
+            elif self.total_attempts == game_core.TRIALS_PER_LEVEL:
+                self._enter(GAME_OVER, start, GAME_OVER_DURATION)
+            else:
+                self._start_trial(start)
+        elif self.phase == LEVEL_COMPLETE:
+            self._start_level()
+            self._start_trial(start)
+        elif self.phase == GAME_OVER:
+            self._enter(FINISHED, start)
+
+    # Function to score the player's answer to the current sequence
+    def submit_input(self, player_input, now):
+        if self.phase != COLLECT_INPUT:
+            return
+        self.player_input = player_input
+        self.last_correct = game_core.is_correct(player_input, self.sequence)
+        if self.last_correct:
+            self.correct_attempts += 1
+            self.score += 1
+        else:
+            self.remaining_chances -= 1
+        self._enter(FEEDBACK, now, FEEDBACK_DURATION)
+
+    # Function to stop the game straight away, e.g. when the player quits
+    def abort(self):
+        self.aborted = True
+        self._enter(FINISHED, None)
+
+
+# Function to play a whole game without waiting, answering each trial with get_answer(sequence)
+def run_instantly(flow, get_answer):
+    now = flow.deadline
+    while flow.phase != FINISHED:
+        if flow.phase == COLLECT_INPUT:
+            flow.submit_input(get_answer(flow.sequence), now)
+        now = flow.deadline
+        flow.update(now)
+    return flow
@@ -0,0 +1,70 @@
+import time
+
+import pygame
+
+import metrics
+import presentation
+
+# Session record/replay hooks (see session_log.py): a recorder is shown every batch of events
+# handed to a screen, and a replayer supplies the batches instead of pygame
+recorder = None
+replayer = None
+
+
+# Returned by an event handler to finish the screen with the given value
+class ScreenExit:
+    def __init__(self, value):
+        self.value = value
+
+
+# Function to read the session clock for a decision that depends on the time, such as a deadline
+# or when an answer came in. The reading is logged while recording and read back from the log
+# while replaying, so a replay takes every decision at exactly the recorded time.
+def session_clock():
+    if replayer is not None:
+        return replayer.clock_reading()
+    now = presentation.clock()
+    if recorder is not None:
+        recorder.clock_reading(now)
+    return now
+
+
+# Function to draw one frame, timing it when metrics are enabled
+def _draw_frame(draw):
+    if not metrics.enabled:
+        draw()
+        return
+    started = time.perf_counter()
+    draw()
+    metrics.observe("memory_test_frame_seconds", time.perf_counter() - started)
+
+
+# Function to run one screen until its event handler returns a ScreenExit.
+# While idle the loop blocks in pygame.event.wait (optionally waking up after timeout ms),
+# so an idle screen uses no CPU. Animated screens pass a timeout and redraw when it expires;
+# the screen is redrawn only after input or timer events, never while nothing happens.
+def run_screen(handle_event, draw, timeout=None):
+    hook = replayer or recorder
+    screen = hook.start_screen() if hook is not None else None
+    _draw_frame(draw)
+
+    while True:
+        if replayer is not None:
+            events = replayer.next_events(screen)
+        else:
+            wait_ms = timeout() if callable(timeout) else timeout
+            if wait_ms is None:
+                first_event = pygame.event.wait()
+            else:
+                first_event = pygame.event.wait(max(1, int(wait_ms)))
+            # Drain everything that queued up so a burst of input costs one redraw
+            events = [first_event] + pygame.event.get()
+        if recorder is not None:
+            recorder.batch(screen, events)
+
+        for event in events:
+            result = handle_event(event)
+            if isinstance(result, ScreenExit):
+                return result.value
+
+        _draw_frame(draw)
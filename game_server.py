@@ -0,0 +1,219 @@
+import argparse
+import asyncio
+import json
+import random
+from collections import deque
+
+import game_core
+import game_flow
+
+# Server mode: many concurrent memory test sessions in one asyncio process, each driven by the
+# same GameFlow and game_core rules as the pygame window. Thin clients do the display and input
+# and talk JSON lines over TCP:
+#
+#   client -> server  {"type": "start", "user": {...}}   begin a session
+#                     {"type": "answer", "text": "123"}  answer the current sequence
+#                     {"type": "quit"}                   abort the session
+#                     {"type": "stats"}                  server counters
+#   server -> client  {"type": "phase", "phase": ..., "level": ..., "score": ..., ...} on every phase change
+#                     {"type": "finished", "score": ..., "level": ..., "aborted": ...}
+#
+# Every session waits on its own deadline or its client's next line, so one session's timers
+# never hold up another's. load_generator.py plays hundreds of sessions against it.
+
+DEFAULT_PORT = 8765
+# Phase-change lateness samples kept for the statistics
+LATENESS_SAMPLES = 100000
+
+
+# Function to build the message describing the flow's current phase
+def phase_message(flow):
+    message = {
+        "type": "phase",
+        "phase": flow.phase,
+        "level": flow.level,
+        "score": flow.score,
+        "remaining_chances": flow.remaining_chances,
+    }
+    if flow.phase == game_flow.PRESENT_DIGIT:
+        message["digit"] = flow.current_digit
+        message["position"] = flow.digit_index
+    elif flow.phase == game_flow.COLLECT_INPUT:
+        message["length"] = flow.sequence_length
+    elif flow.phase == game_flow.FEEDBACK:
+        message["sequence"] = "".join(map(str, flow.sequence))
+        message["player_input"] = flow.player_input
+        message["correct"] = flow.last_correct
+    return message
+
+
+class GameServer:
+    # results is an optional results_store.ResultsStore; time_scale > 1 runs every phase faster
+    def __init__(self, results=None, time_scale=1.0, seed=None):
+        self.results = results
+        self.time_scale = time_scale
+        self.rng = random.Random(seed)
+        self.active_sessions = 0
+        self.finished_sessions = 0
+        self.trials = 0
+        self.lateness = deque(maxlen=LATENESS_SAMPLES)  # Seconds each phase change came after its deadline
+        self._server = None
+        self._clients = set()
+
+    # Game time in seconds; GameFlow deadlines are kept in this clock
+    def clock(self):
+        return asyncio.get_running_loop().time() * self.time_scale
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT):
+        self._server = await asyncio.start_server(self.handle_client, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        for client in self._clients:
+            client.cancel()
+        await asyncio.gather(*self._clients, return_exceptions=True)
+        await self._server.wait_closed()
+
+    def statistics(self):
+        lateness = sorted(self.lateness)
+        return {
+            "active_sessions": self.active_sessions,
+            "finished_sessions": self.finished_sessions,
+            "trials": self.trials,
+            "lateness_median_ms": lateness[len(lateness) // 2] * 1000 if lateness else None,
+            "lateness_max_ms": lateness[-1] * 1000 if lateness else None,
+        }
+
+    async def handle_client(self, reader, writer):
+        # Lines are read by their own task so a session can wait for "next line or deadline"
+        # without cancelling reads; None in the inbox means the client is gone
+        self._clients.add(asyncio.current_task())
+        inbox = asyncio.Queue()
+        receiver = asyncio.ensure_future(_receive(reader, inbox))
+        try:
+            while True:
+                message = await inbox.get()
+                if message is None:
+                    break
+                if not isinstance(message, dict):
+                    continue  # Not a request object; ignore it
+                if message.get("type") == "start":
+                    if not await self.run_session(inbox, writer, message.get("user") or {}):
+                        break
+                elif message.get("type") == "stats":
+                    await send_message(writer, dict(self.statistics(), type="stats"))
+        except (ConnectionError, asyncio.CancelledError):
+            pass  # Client went away, or the server is shutting down
+        finally:
+            receiver.cancel()
+            writer.close()
+            self._clients.discard(asyncio.current_task())
+
+    # Function to run one session over the connection; returns False if the client disconnected
+    async def run_session(self, inbox, writer, user_data):
+        rng = random.Random(self.rng.random())
+        flow = game_flow.GameFlow(lambda length: game_core.generate_sequence(length, rng), self.clock())
+        session_id = self.results.start_session(user_data) if self.results else None
+        connected = True
+        self.active_sessions += 1
+        try:
+            await send_message(writer, phase_message(flow))
+            while flow.phase != game_flow.FINISHED:
+                remaining = flow.time_until_deadline(self.clock())
+                timeout = None if remaining is None else remaining / self.time_scale
+                try:
+                    message = await asyncio.wait_for(inbox.get(), timeout)
+                except asyncio.TimeoutError:
+                    message = False
+
+                if message is not False:
+                    if message is not None and not isinstance(message, dict):
+                        continue
+                    if message is None or message.get("type") == "quit":
+                        connected = message is not None
+                        flow.abort()
+                        break
+                    if message.get("type") == "answer" and flow.phase == game_flow.COLLECT_INPUT:
+                        player_input = str(message.get("text", ""))
+                        flow.submit_input(player_input, self.clock())
+                        self.trials += 1
+                        if self.results:
+                            self.results.record_trial(session_id, flow.level, flow.total_attempts, flow.sequence, player_input, flow.last_correct)
+                        await send_message(writer, phase_message(flow))
+                    continue
+
+                # One deadline at a time, so a late wake-up still sends every digit it passed
+                now = self.clock()
+                while flow.deadline is not None and now >= flow.deadline:
+                    deadline = flow.deadline
+                    flow.update(deadline)
+                    self.lateness.append((now - deadline) / self.time_scale)
+                    if flow.phase != game_flow.FINISHED:
+                        await send_message(writer, phase_message(flow))
+        finally:
+            self.active_sessions -= 1
+            self.finished_sessions += 1
+            if self.results:
+                self.results.finish_session(session_id, flow.score, flow.level, completed=not flow.aborted)
+
+        if connected:
+            await send_message(writer, {"type": "finished", "score": flow.score, "level": flow.level, "aborted": flow.aborted})
+        return connected
+
+
+# Function to read one JSON line; None at end of stream
+async def read_message(reader):
+    line = await reader.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+# Function to queue every line from the client, then None once it disconnects or sends bad JSON
+async def _receive(reader, inbox):
+    try:
+        while True:
+            message = await read_message(reader)
+            inbox.put_nowait(message)
+            if message is None:
+                return
+    except (ConnectionError, ValueError):
+        inbox.put_nowait(None)
+
+
+async def send_message(writer, message):
+    writer.write(json.dumps(message).encode() + b"\n")
+    await writer.drain()
+
+
+async def main(host, port, time_scale, results_path):
+    results = None
+    if results_path:
+        import results_store
+        results = results_store.ResultsStore(results_path)
+    server = GameServer(results, time_scale)
+    port = await server.start(host, port)
+    print(f"Serving memory test sessions on {host}:{port}")
+    try:
+        await server.serve_forever()
+    finally:
+        if results:
+            results.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Host many memory test sessions in one process.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--time-scale", type=float, default=1.0, help="run phases this many times faster")
+    parser.add_argument("--results", help="SQLite results store to save sessions to")
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.host, args.port, args.time_scale, args.results))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,99 @@
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+import game_server
+import simulation
+
+# Load generator for game_server.py: opens one connection per simulated player, plays whole
+# sessions with the scripted players from simulation.py and reports throughput and latency.
+#   python load_generator.py --players 500 --time-scale 20
+# Without --port an in-process server is started, so its timer lateness is reported as well.
+
+
+# Function to play one session over a fresh connection; returns (trials, answer latencies)
+async def play(host, port, player, max_level):
+    reader, writer = await asyncio.open_connection(host, port)
+    digits = []
+    latencies = []
+    trials = 0
+    answered_at = None
+    try:
+        await game_server.send_message(writer, {"type": "start", "user": {}})
+        while True:
+            message = await game_server.read_message(reader)
+            if message is None or message["type"] == "finished":
+                return trials, latencies
+            if message["phase"] == "present_digit":
+                if message["position"] == 0:
+                    digits = []
+                digits.append(message["digit"])
+            elif message["phase"] == "collect_input":
+                if message["level"] > max_level:
+                    await game_server.send_message(writer, {"type": "quit"})
+                    continue
+                answered_at = time.perf_counter()
+                await game_server.send_message(writer, {"type": "answer", "text": player.answer(digits)})
+            elif message["phase"] == "feedback" and answered_at is not None:
+                latencies.append(time.perf_counter() - answered_at)
+                answered_at = None
+                trials += 1
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+# Function to play players sessions at once and summarize the run
+async def run_load(players, player_name="error_rate", player_args=(), host="127.0.0.1", port=None,
+                   time_scale=20.0, seed=0, max_level=simulation.MAX_LEVEL):
+    server = None
+    if port is None:
+        server = game_server.GameServer(time_scale=time_scale, seed=seed)
+        port = await server.start(host, 0)
+
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    sessions = await asyncio.gather(*(
+        play(host, port, simulation.PLAYERS[player_name](random.Random(rng.random()), *player_args), max_level)
+        for _ in range(players)
+    ))
+    wall = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+
+    trials = sum(session_trials for session_trials, _ in sessions)
+    latencies = sorted(latency * 1000 for _, session_latencies in sessions for latency in session_latencies)
+    summary = {
+        "players": players,
+        "wall_seconds": wall,
+        "cpu_seconds": cpu,
+        "trials": trials,
+        "trials_per_second": trials / wall,
+        "answer_latency_median_ms": statistics.median(latencies) if latencies else None,
+        "answer_latency_p99_ms": latencies[int(len(latencies) * 0.99)] if latencies else None,
+        "answer_latency_max_ms": latencies[-1] if latencies else None,
+    }
+    if server is not None:
+        summary["server"] = dict(server.statistics(), time_scale=time_scale)
+        await server.close()
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate many simultaneous players against the game server.")
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--player", choices=sorted(simulation.PLAYERS), default="error_rate")
+    parser.add_argument("--player-args", nargs="*", type=float, default=[], help="e.g. the error rate (default 0.05) or the span")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None, help="use a running server instead of an in-process one")
+    parser.add_argument("--time-scale", type=float, default=20.0, help="phase speed-up of the in-process server")
+    parser.add_argument("--max-level", type=int, default=simulation.MAX_LEVEL)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    summary = asyncio.run(run_load(args.players, args.player, args.player_args, args.host, args.port,
+                                   args.time_scale, args.seed, args.max_level))
+    print(json.dumps(summary, indent=2))
@@ -1,17 +1,26 @@
 import pygame
 import random
 import time
-import speech_recognition as sr
+import adaptive
+import digit_parser
+import game_core
+import game_flow
+import game_loop
+import metrics
 import os
-
-# Initialize pygame
-pygame.init()
+import presentation
+import results_store
+import session_log
+import startup_profile
+import sys
+import threading
+from game_loop import ScreenExit, run_screen
+from render_cache import ScreenRenderer, get_background, render_text
 
 # Set display dimensions
 screen_width = 1200
 screen_height = 900
-screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
-pygame.display.set_caption("Memory Test")
+screen = None  # Created by init_display()
 
 # Define colors
 WHITE = (255, 255, 255)
@@ -23,54 +32,128 @@ DARK_BLUE = (0, 0, 128)       # Text contrast color
 DARK_GREY = (50, 50, 50)
 BUTTON_HOVER = (50, 205, 50)  # Hover effect for buttons
 
-# Define fonts
-title_font = pygame.font.Font(None, 100)  # Large title font for the main title like "Memory Test"
-regular_font = pygame.font.Font(None, 60)  # Regular font for important in-game messages like "Correct!" or "Wrong!"
-small_font = pygame.font.Font(None, 40)    # Smaller font for instructions and descriptions
-button_font = pygame.font.Font(None, 50)   # Font for button text like "Start"
+# Define fonts; each one is loaded the first time it is used
+FONT_SIZES = {
+    "title": 100,    # Large title font for the main title like "Memory Test"
+    "regular": 60,   # Regular font for important in-game messages like "Correct!" or "Wrong!"
+    "small": 40,     # Smaller font for instructions and descriptions
+    "button": 50,    # Font for button text like "Start"
+}
+fonts = {}
+
+def get_font(name):
+    font = fonts.get(name)
+    if font is None:
+        font = fonts[name] = pygame.font.Font(None, FONT_SIZES[name])
+    return font
+
+# Frames are drawn over a cached gradient and only the changed regions are pushed to the display
+renderer = None
+
+# Function to open the window. Only the display and font modules are initialized, so startup
+# does not wait for audio or other devices the start screen does not need.
+def init_display():
+    global screen, renderer
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+    pygame.display.set_caption("Memory Test")
+    renderer = ScreenRenderer(screen, "gradient", LIGHT_BLUE)
+
+# Speech is captured and recognized on a worker thread with one microphone stream per session;
+# each result wakes the event loop through SPEECH_RESULT_EVENT. The recognizer backend is chosen
+# with MEMORY_TEST_SPEECH_BACKEND (see speech_backends.py). The speech stack is imported and the
+# microphone opened in the background once the start screen is up (see prewarm_speech()).
+SPEECH_RESULT_EVENT = pygame.USEREVENT + 1
+recognizer = None
+speech = None
+speech_thread = None
+
+def post_speech_result():
+    pygame.event.post(pygame.event.Event(SPEECH_RESULT_EVENT))
+
+def _create_speech():
+    global recognizer, speech
+    try:
+        import speech_recognition as sr
+        import speech_backends
+        import speech_service
+    except ImportError as error:
+        print(f"Speech input unavailable: {error}")
+        return
+
+    # Initialize speech recognition
+    recognizer = sr.Recognizer()
+    recognizer.pause_threshold = 1.0
+    recognizer.energy_threshold = 200
+    service = speech_service.SpeechService(recognizer, speech_backends.backend_from_environment(recognizer), on_result=post_speech_result)
+    service.start()
+    speech = service
+
+# Function to import the speech stack and open the microphone on a background thread
+def prewarm_speech():
+    global speech_thread
+    if speech is None and speech_thread is None:
+        speech_thread = threading.Thread(target=_create_speech, name="speech-prewarm", daemon=True)
+        speech_thread.start()
+
+# Function to get the speech service, waiting for the background start-up if it is still running;
+# None when speech input is unavailable
+def get_speech():
+    prewarm_speech()
+    if speech_thread is not None:
+        speech_thread.join()
+    return speech
+
+
+# Function to create a gradient background (built once per display mode, then blitted)
+def draw_gradient_background():
+    screen.blit(get_background(screen, "gradient", LIGHT_BLUE), (0, 0))
+    renderer.invalidate()
 
-# Initialize speech recognition
-recognizer = sr.Recognizer()
+# Function to draw cached text centered horizontally (and vertically when no y is given)
+def draw_centered_text(font, message, color, y=None):
+    text = render_text(font, message, color)
+    if y is None:
+        y = screen_height // 2 - text.get_height() // 2
+    return renderer.blit(text, (screen_width // 2 - text.get_width() // 2, y))
 
-# Function to create a gradient background
-def draw_gradient_background():
-    for i in range(screen_height):
-        # Clamp color values to the range of 0-255
-        r = max(0, min(255, LIGHT_BLUE[0] - i // 5))
-        g = max(0, min(255, LIGHT_BLUE[1] - i // 10))
-        b = max(0, min(255, LIGHT_BLUE[2]))
-        color = (r, g, b)
-        pygame.draw.line(screen, color, (0, i), (screen_width, i))
+# Sequences come from this generator, seeded per session so a recorded session can be replayed
+rng = random.Random()
 
 # Function to generate a random sequence of numbers
 def generate_sequence(length):
-    return [random.randint(1, 9) for _ in range(length)]
-
-# Function to show each number in the sequence one by one
-def show_sequence(sequence):
-    for number in sequence:
-        draw_gradient_background()  # Soft gradient background
-        text = regular_font.render(str(number), True, DARK_BLUE)  # Displaying numbers using regular font
-        screen.blit(text, (screen_width // 2 - text.get_width() // 2, screen_height // 2 - text.get_height() // 2))
-        pygame.display.flip()
-        time.sleep(1)
-        draw_gradient_background()
-        pygame.display.flip()
-        time.sleep(0.5)
+    return game_core.generate_sequence(length, rng)
 
 # Function to display messages in the center of the screen
 def display_message(message, color=BLACK):
-    draw_gradient_background()  # Gradient background
-    text = regular_font.render(message, True, color)  # Displaying main messages like "Correct!" or "Wrong!" using regular font
-    screen.blit(text, (screen_width // 2 - text.get_width() // 2, screen_height // 2 - text.get_height() // 2))
-    pygame.display.flip()
+    renderer.begin_frame()  # Gradient background
+    draw_centered_text(get_font("regular"), message, color)  # Displaying main messages like "Correct!" or "Wrong!" using regular font
+    renderer.end_frame()
+
+# Function to tell whether event ends the game: closing the window or pressing Escape
+def is_quit(event):
+    return event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE)
+
+# Function to show a message for a while without blocking the event loop.
+# Returns False if the player quit; the quit event is put back for the caller to handle.
+def display_message_for(message, color, duration_ms):
+    deadline = game_loop.session_clock() + duration_ms / 1000
+
+    def handle_event(event):
+        if is_quit(event):
+            pygame.event.post(pygame.event.Event(pygame.QUIT))  # Escape ends the game just like closing the window
+            return ScreenExit(False)
+        if game_loop.session_clock() >= deadline:
+            return ScreenExit(True)
+
+    return run_screen(handle_event, lambda: display_message(message, color), timeout=lambda: (deadline - presentation.clock()) * 1000)
 
 # Function to create rounded buttons
 def create_button(x, y, width, height, color, text):
-    button_rect = pygame.Rect(x, y, width, height)
-    pygame.draw.rect(screen, color, button_rect, border_radius=15)  # Rounded corners
-    button_text = button_font.render(text, True, BLACK)
-    screen.blit(button_text, (x + (width - button_text.get_width()) // 2, y + (height - button_text.get_height()) // 2))
+    button_rect = renderer.draw_rect(color, (x, y, width, height), border_radius=15)  # Rounded corners
+    button_text = render_text(get_font("button"), text, BLACK)
+    renderer.blit(button_text, (x + (width - button_text.get_width()) // 2, y + (height - button_text.get_height()) // 2))
     return button_rect
 
 # Function to handle button hover effect
@@ -80,163 +163,324 @@ def handle_button_hover(button_rect, default_color, hover_color):
         return hover_color
     return default_color
 
+# Function to wait for one spoken answer of length digits while the screen keeps animating.
+# Returns (status, text), or None if the player quit.
+def listen_for_speech(length):
+    speech = get_speech()
+    request_id = speech.listen(length)  # Capture stops once length digits have been spoken
+    started = presentation.clock()
+
+    def draw():
+        if not speech.ready.is_set():
+            display_message("Calibrating microphone... Please wait.", DARK_BLUE)
+        else:
+            dots = "." * (1 + int((presentation.clock() - started) / 0.4) % 3)
+            display_message(f"Speak the sequence clearly{dots}", DARK_BLUE)
+
+    def handle_event(event):
+        if is_quit(event):
+            pygame.event.post(pygame.event.Event(pygame.QUIT))
+            return ScreenExit(None)
+        speech.check_deadline(request_id)  # A late result is answered SERVICE_ERROR, which wakes us up again
+        if event.type == SPEECH_RESULT_EVENT:
+            result = speech.poll(request_id)
+            if game_loop.recorder is not None:
+                game_loop.recorder.speech(result)
+            if result is not None:
+                return ScreenExit(result)
+
+    return run_screen(handle_event, draw, timeout=400)
+
+# Returned by get_player_voice_input while the speech service is known to be down (its circuit
+# breaker is open), so the answer is typed straight away without the switching message
+VOICE_UNAVAILABLE = object()
+
 # Function to get player's voice input using speech recognition
 def get_player_voice_input(length):
+    if get_speech() is None:
+        return None
+    import speech_service
+
     input_str = ""
-    recognizer.pause_threshold = 1.0
-    recognizer.energy_threshold = 200
     max_attempts = 2
     attempts = 0
 
     while attempts < max_attempts:
-        try:
-            with sr.Microphone() as source:
-                display_message("Calibrating microphone... Please wait.", DARK_BLUE)
-                pygame.display.flip()
-                recognizer.adjust_for_ambient_noise(source, duration=0.1)
-
-                display_message("Speak the sequence clearly...", DARK_BLUE)
-                pygame.display.flip()
-
-                audio = recognizer.listen(source)
-                spoken_text = recognizer.recognize_google(audio)
-                print(f"You said: {spoken_text}")
-
-                digits = [char for char in spoken_text if char.isdigit()]
-                input_str = ''.join(digits[:length])
-
-                if len(input_str) == length:
-                    return input_str
-                else:
-                    display_message(f"Please speak exactly {length} numbers.", RED)
-                    pygame.time.wait(2000)
-                    attempts += 1
-
-        except sr.UnknownValueError:
-            display_message("Sorry, I couldn't understand. Try again.", RED)
-            pygame.time.wait(2000)
+        result = listen_for_speech(length)
+        if result is None:
+            return None
+        status, spoken_text = result
+
+        if status == speech_service.RECOGNIZED:
+            print(f"You said: {spoken_text}")
+
+            # Number words, homophones like "for" or "ate" and compounds like "twenty three" all count
+            input_str = digit_parser.parse_digits(spoken_text)[:length]
+
+            if len(input_str) == length:
+                return input_str
+            else:
+                if not display_message_for(f"Please speak exactly {length} numbers.", RED, 2000):
+                    return None
+                attempts += 1
+
+        elif status == speech_service.NOT_UNDERSTOOD:
+            if not display_message_for("Sorry, I couldn't understand. Try again.", RED, 2000):
+                return None
             attempts += 1
-        except sr.RequestError:
-            display_message("Error with the speech recognition service.", RED)
-            pygame.time.wait(2000)
+        elif status == speech_service.SERVICE_ERROR:
+            display_message_for("Error with the speech recognition service.", RED, 2000)
+            return None
+        elif status == speech_service.SERVICE_UNAVAILABLE:
+            return VOICE_UNAVAILABLE
+        else:
+            # No microphone on this station
             return None
 
     return None
 
+# Function to draw the typing prompt with what has been typed so far
+def draw_typing_prompt(length, input_str):
+    renderer.begin_frame()
+    draw_centered_text(get_font("regular"), f"Please type the {length} numbers:", DARK_BLUE)  # Displaying typing instructions using small font
+    draw_centered_text(get_font("regular"), input_str, BLACK, screen_height // 2)
+    renderer.end_frame()
+
 # Function to handle manual typing input
 def get_player_typing_input(length):
     input_str = ""
-    typing_done = False
-
-    while not typing_done:
-        draw_gradient_background()
-        display_message(f"Please type the {length} numbers:", DARK_BLUE)  # Displaying typing instructions using small font
-        input_display = regular_font.render(input_str, True, BLACK)
-        screen.blit(input_display, (screen_width // 2 - input_display.get_width() // 2, screen_height // 2))
-        pygame.display.flip()
-
-        # Handle keyboard input for manual typing
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                return None
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_RETURN and len(input_str) == length:
-                    typing_done = True
-                elif event.key == pygame.K_BACKSPACE:
-                    input_str = input_str[:-1]
-                elif len(input_str) < length and event.unicode.isdigit():
-                    input_str += event.unicode
 
-    return input_str
+    # Handle keyboard input for manual typing
+    def handle_event(event):
+        nonlocal input_str
+        if is_quit(event):
+            return ScreenExit(None)
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_RETURN and len(input_str) == length:
+                return ScreenExit(input_str)
+            elif event.key == pygame.K_BACKSPACE:
+                input_str = input_str[:-1]
+            elif len(input_str) < length and event.unicode and event.unicode in "0123456789":  # Not isdigit(), which also accepts superscripts and other scripts' digits
+                input_str += event.unicode
+
+    return run_screen(handle_event, lambda: draw_typing_prompt(length, input_str))
 
 # Function to switch between voice and typing input
 def get_player_input(length):
+    started = time.perf_counter()
     player_input = get_player_voice_input(length)
+    metrics.observe("memory_test_input_seconds", time.perf_counter() - started, ("method", "voice"))
     
-    if player_input is None:
-        display_message("Switching to typing input...", DARK_BLUE)  # Displaying switch message using regular font
-        pygame.time.wait(2000)
+    if player_input is None or player_input is VOICE_UNAVAILABLE:
+        if player_input is None:
+            display_message_for("Switching to typing input...", DARK_BLUE, 2000)  # Displaying switch message using regular font
+        started = time.perf_counter()
         player_input = get_player_typing_input(length)
+        metrics.observe("memory_test_input_seconds", time.perf_counter() - started, ("method", "typing"))
     
     return player_input
 
-# Function to run the memory test game
-def memory_test(user_data):
-    level = 1  # Start at level 1
-    score = 0  # Track the score
-    running = True  # Game loop flag
-
-    while running:
-        sequence_length = 3 + (level - 1)
-        correct_attempts = 0  # Track correct attempts per level
-        total_attempts = 0  # Track total attempts per level
-        remaining_chances = 3  # Player starts with 3 chances per level
-
-        while total_attempts < 3:
-            sequence = generate_sequence(sequence_length)
-            show_sequence(sequence)
-
-            player_input = get_player_input(sequence_length)
-
-            correct_guesses = sum(1 for i, j in zip(player_input, sequence) if i == str(j))
-
-            draw_gradient_background()
-            display_sequence_text = small_font.render(f"Display numbers: {''.join(map(str, sequence))}", True, DARK_BLUE)  # Sequence display using small font
-            screen.blit(display_sequence_text, (screen_width // 2 - display_sequence_text.get_width() // 2, screen_height // 2 - display_sequence_text.get_height() // 2))
-
-            player_input_text = small_font.render(f"You said: {player_input}", True, BLACK)
-            screen.blit(player_input_text, (screen_width // 2 - player_input_text.get_width() // 2, screen_height - 100))
-
-            if correct_guesses == sequence_length:
-                correct_attempts += 1
-                score += 1
-                result_text = "Correct!"
-                result_color = GREEN
+# Function to draw the screen for the current phase of the game flow.
+# With present=False the frame is only prepared and the caller shows it with renderer.present_frame().
+def draw_flow(flow, present=True):
+    renderer.begin_frame()  # Background only during the blank between digits
+
+    if auditory_presenter is not None and flow.phase in (game_flow.PRESENT_DIGIT, game_flow.BLANK):
+        draw_centered_text(get_font("regular"), "Listen...", DARK_BLUE)  # The digits are played, not shown
+
+    elif flow.phase == game_flow.PRESENT_DIGIT:
+        draw_centered_text(get_font("regular"), str(flow.current_digit), DARK_BLUE)  # Displaying numbers using regular font
+
+    elif flow.phase == game_flow.FEEDBACK:
+        draw_centered_text(get_font("small"), f"Display numbers: {''.join(map(str, flow.sequence))}", DARK_BLUE)  # Sequence display using small font
+        draw_centered_text(get_font("small"), f"You said: {flow.player_input}", BLACK, screen_height - 100)
+
+        # Display the result of the attempt and chances left
+        if flow.last_correct:
+            draw_centered_text(get_font("regular"), "Correct!", GREEN, screen_height // 2 + 50)  # Result display using regular font
+        else:
+            draw_centered_text(get_font("regular"), "Wrong!", RED, screen_height // 2 + 50)
+
+        # Show chances left (the adaptive mode has no levels, so no chances either)
+        if flow.procedure is None:
+            draw_centered_text(get_font("small"), f"Chances Left: {flow.remaining_chances}", RED, screen_height // 2 + 100)  # Chances left using small font
+
+    elif flow.phase == game_flow.LEVEL_COMPLETE:
+        draw_centered_text(get_font("regular"), f"Level {flow.level - 1} Completed!", DARK_BLUE, screen_height // 3)  # Display level completion using regular font
+        draw_centered_text(get_font("small"), f"Points: {flow.score}", BLACK, screen_height // 2)  # Points display using small font
+
+    elif flow.phase == game_flow.GAME_OVER:
+        # Display Game Over screen and final score
+        draw_centered_text(get_font("regular"), "Game Over", RED, screen_height // 3)  # Game over message using regular font
+        draw_centered_text(get_font("small"), f"Your score: {flow.score}", BLACK, screen_height // 2)  # Final score display using small font
+        if flow.span_estimate is not None:
+            draw_centered_text(get_font("small"), f"Estimated span: {flow.span_estimate:.1f} digits", BLACK, screen_height // 2 + 50)
+
+    if present:
+        renderer.end_frame()
+    else:
+        renderer.prepare_frame()
+
+# Flip-on/flip-off times of every digit in the current session; their statistics are saved with
+# the session's results (see presentation_log.statistics())
+presentation_log = presentation.PresentationLog()
+
+# auditory.AuditoryPresenter when the digits are played instead of shown (MEMORY_TEST_PRESENTATION=auditory);
+# it logs playback times to presentation_log in place of flip times. The digit sounds are
+# loaded in the background once the start screen is up (see prewarm_auditory()); if that fails,
+# auditory_error holds why and the test does not start.
+auditory_presentation = False
+auditory_presenter = None
+auditory_thread = None
+auditory_error = None
+
+def _create_auditory_presenter():
+    global auditory_presenter, auditory_error
+    try:
+        import auditory
+        auditory_presenter = auditory.AuditoryPresenter(log=presentation_log)
+    except Exception as error:
+        auditory_error = error
+        print(f"Auditory presentation unavailable: {error!r}", file=sys.stderr)
+
+# Function to load the digit sounds on a background thread when auditory presentation is on
+def prewarm_auditory():
+    global auditory_thread
+    if auditory_presentation and auditory_presenter is None and auditory_thread is None:
+        auditory_thread = threading.Thread(target=_create_auditory_presenter, name="auditory-prewarm", daemon=True)
+        auditory_thread.start()
+
+# Function to wait until the digit sounds are loaded, if they are being loaded; returns False
+# when auditory presentation is on but could not be set up
+def wait_for_auditory():
+    prewarm_auditory()
+    if auditory_thread is not None:
+        auditory_thread.join()
+    return not auditory_presentation or auditory_presenter is not None
+
+# Function to play the whole sequence when the flow reaches a trial's first digit; the sound is
+# prepared before scheduled and started on it
+def play_sequence(flow, scheduled):
+    auditory_presenter.prepare(flow.sequence, game_flow.DIGIT_DURATION + game_flow.BLANK_DURATION)
+    auditory_presenter.play(flow.level, flow.total_attempts, scheduled)
+
+# Function to switch to the next phase exactly at its deadline: the next frame is drawn ahead of
+# time and only the display update happens on the deadline, so a slow render does not delay it
+def present_next_phase(flow):
+    deadline = flow.deadline
+    previous_phase = flow.phase
+    flow.update(deadline)
+    draw_flow(flow, present=False)
+    if auditory_presenter is not None:
+        if flow.phase == game_flow.PRESENT_DIGIT and flow.digit_index == 0:
+            play_sequence(flow, deadline)
+        presentation.wait_until(deadline)
+        renderer.present_frame()
+        # The sound plays on by itself; its position is read at each onset and offset
+        if previous_phase == game_flow.PRESENT_DIGIT:
+            auditory_presenter.digit_off()
+        if flow.phase == game_flow.PRESENT_DIGIT and flow.digit_index > 0:
+            auditory_presenter.digit_on(flow.digit_index)
+        return
+    presentation.wait_until(deadline)
+    renderer.present_frame()
+    flipped = presentation.clock()
+
+    if previous_phase == game_flow.PRESENT_DIGIT:
+        presentation_log.digit_off(deadline, flipped)
+    if flow.phase == game_flow.PRESENT_DIGIT:
+        presentation_log.digit_on(flow.level, flow.total_attempts, flow.digit_index, flow.current_digit, deadline, flipped)
+
+# Function to run the memory test game. The timed phases are driven by the event loop,
+# so the window keeps pumping events and Escape or closing the window ends the game at any time.
+# Sessions and trials are saved to results (a results_store.ResultsStore) when one is given.
+# With procedure (an adaptive.QuestProcedure) sequence lengths adapt to the player instead of
+# going up one level at a time, and the game ends once the span has been estimated.
+# seed fixes the sequences (a random one is drawn by default); with MEMORY_TEST_RECORD_DIR set
+# the session is recorded there for session_log.py to replay. Returns the score, or None when
+# the digits cannot be presented the way the station is set up to (then nothing is saved).
+def memory_test(user_data, results=None, procedure=None, seed=None):
+    if not wait_for_auditory():
+        # Never fall back to showing the digits: the result would pass for an auditory span
+        display_message_for(f"Auditory presentation unavailable: {auditory_error}", RED, 5000)
+        return None
+    prewarm_speech()  # Open and calibrate the microphone while the first sequence is shown
+    presentation_log.clear()
+    if seed is None:
+        seed = random.getrandbits(64)
+    rng.seed(seed)
+    started = presentation.clock()
+    record_dir = os.environ.get("MEMORY_TEST_RECORD_DIR")
+    if record_dir and game_loop.replayer is None:
+        mode = "adaptive" if procedure is not None else "levels"
+        game_loop.recorder = session_log.Recorder(session_log.recording_path(record_dir), seed, started, mode)
+    flow = game_flow.GameFlow(generate_sequence, started, procedure)
+    presentation_mode = "auditory" if auditory_presenter is not None else "visual"
+    session_id = results.start_session(user_data, presentation=presentation_mode) if results else None
+    draw_flow(flow)
+    if auditory_presenter is not None:
+        play_sequence(flow, started)
+    else:
+        presentation_log.digit_on(flow.level, flow.total_attempts, flow.digit_index, flow.current_digit, started, presentation.clock())
+    timed_phase = flow.phase
+    phase_started = started
+
+    # Function to record how long the phase that just ended lasted (only with metrics enabled)
+    def time_phase():
+        nonlocal timed_phase, phase_started
+        if metrics.enabled and flow.phase != timed_phase:
+            now = presentation.clock()
+            metrics.observe("memory_test_phase_seconds", now - phase_started, ("phase", timed_phase))
+            timed_phase = flow.phase
+            phase_started = now
+
+    def handle_event(event):
+        if is_quit(event):
+            flow.abort()
+        remaining = flow.time_until_deadline(game_loop.session_clock())
+        if remaining is not None and remaining <= presentation.PRESENTATION_LEAD:
+            present_next_phase(flow)
+        flow.update(game_loop.session_clock())
+        time_phase()
+
+        if flow.phase == game_flow.COLLECT_INPUT:
+            player_input = get_player_input(flow.sequence_length)
+            if player_input is None:
+                flow.abort()
             else:
-                result_text = "Wrong!"
-                result_color = RED
-                remaining_chances -= 1
-
-            # Display the result of the attempt and chances left
-            result_display = regular_font.render(result_text, True, result_color)  # Result display using regular font
-            screen.blit(result_display, (screen_width // 2 - result_display.get_width() // 2, screen_height // 2 + 50))
-
-            # Show chances left
-            chances_left_text = small_font.render(f"Chances Left: {remaining_chances}", True, RED)  # Chances left using small font
-            screen.blit(chances_left_text, (screen_width // 2 - chances_left_text.get_width() // 2, screen_height // 2 + 100))
-
-            pygame.display.flip()
-            time.sleep(2)
-
-            total_attempts += 1
-
-            if total_attempts == 3 and correct_attempts >= 2:
-                level += 1
-                draw_gradient_background()
-                level_completed_text = regular_font.render(f"Level {level - 1} Completed!", True, DARK_BLUE)  # Display level completion using regular font
-                points_text = small_font.render(f"Points: {score}", True, BLACK)  # Points display using small font
-                screen.blit(level_completed_text, (screen_width // 2 - level_completed_text.get_width() // 2, screen_height // 3))
-                screen.blit(points_text, (screen_width // 2 - points_text.get_width() // 2, screen_height // 2))
-                pygame.display.flip()
-                time.sleep(3)
-                break
-
-        if correct_attempts < 2 and total_attempts == 3:
-            running = False
-
-    # Display Game Over screen and final score
-    draw_gradient_background()
-    game_over_text = regular_font.render("Game Over", True, RED)  # Game over message using regular font
-    score_text = small_font.render(f"Your score: {score}", True, BLACK)  # Final score display using small font
-    screen.blit(game_over_text, (screen_width // 2 - game_over_text.get_width() // 2, screen_height // 3))
-    screen.blit(score_text, (screen_width // 2 - score_text.get_width() // 2, screen_height // 2))
-    pygame.display.flip()
-    time.sleep(5)
-
-# Start screen for the game
-def start_screen():
-    running = True
+                flow.submit_input(player_input, game_loop.session_clock())
+                time_phase()
+                if results:
+                    results.record_trial(session_id, flow.level, flow.total_attempts, flow.sequence, player_input, flow.last_correct)
+
+        if flow.phase == game_flow.FINISHED:
+            return ScreenExit(flow.score)
+
+    # Wake up a little before each deadline so the next frame is ready when it is due
+    def time_until_deadline():
+        remaining = flow.time_until_deadline(presentation.clock())
+        return None if remaining is None else (remaining - presentation.PRESENTATION_LEAD) * 1000
+
+    try:
+        score = run_screen(handle_event, lambda: draw_flow(flow), timeout=time_until_deadline)
+    finally:
+        if game_loop.recorder is not None:
+            game_loop.recorder.close()
+            game_loop.recorder = None
+    if auditory_presenter is not None:
+        auditory_presenter.stop()  # Escape during a sequence cuts the sound off too
+    if get_speech() is not None:
+        speech.stop()
+    if results:
+        # In adaptive mode the level is only the last length tested; the span estimate is the result
+        level_reached = flow.level if flow.procedure is None else None
+        results.finish_session(session_id, flow.score, level_reached, completed=not flow.aborted,
+                               span_estimate=flow.span_estimate, span_sd=flow.span_sd,
+                               presentation_timing=presentation_log.statistics())
+    return score
+
+# Function to draw the start screen
+def draw_start_screen(start_button):
     description = [
         "Understand your capacity to store, retain, and recollect information.",
         "This test will assess your working memory and decision-making.",
@@ -244,36 +488,58 @@ def start_screen():
         "Click Start to begin."
     ]
 
-    while running:
-        draw_gradient_background()
-        title_text = title_font.render("Memory Test", True, DARK_BLUE)  # Displaying the title using large title font
-        screen.blit(title_text, (screen_width // 2 - title_text.get_width() // 2, 50))
+    renderer.begin_frame()
+    draw_centered_text(get_font("title"), "Memory Test", DARK_BLUE, 50)  # Displaying the title using large title font
 
-        y_offset = 150
-        for line in description:
-            text_surface = small_font.render(line, True, DARK_BLUE)  # Displaying description using small font
-            screen.blit(text_surface, (screen_width // 2 - text_surface.get_width() // 2, y_offset))
-            y_offset += 40
+    y_offset = 150
+    for line in description:
+        draw_centered_text(get_font("small"), line, DARK_BLUE, y_offset)  # Displaying description using small font
+        y_offset += 40
 
-        start_button = create_button(screen_width // 2 - 100, screen_height - 150, 200, 50, GREEN, "Start")
-        hover_color = handle_button_hover(start_button, GREEN, BUTTON_HOVER)  # Handle button hover effect
-        start_button = create_button(screen_width // 2 - 100, screen_height - 150, 200, 50, hover_color, "Start")
+    hover_color = handle_button_hover(start_button, GREEN, BUTTON_HOVER)  # Handle button hover effect
+    create_button(start_button.x, start_button.y, start_button.width, start_button.height, hover_color, "Start")
 
-        pygame.display.flip()
+    renderer.end_frame()
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                return False
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if start_button.collidepoint(event.pos):
-                    return True
-
-# Main function to run the game
+# Start screen for the game
+def start_screen():
+    start_button = pygame.Rect(screen_width // 2 - 100, screen_height - 150, 200, 50)
+    draw_start_screen(start_button)
+    startup_profile.first_frame_presented()
+    prewarm_speech()  # Load the speech stack while the player reads the start screen
+    prewarm_auditory()
+
+    def handle_event(event):
+        if is_quit(event):
+            return ScreenExit(False)
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            if start_button.collidepoint(event.pos):
+                return ScreenExit(True)
+
+    return run_screen(handle_event, lambda: draw_start_screen(start_button))
+
+# Main function to run the game. With --startup-profile the game is started in a child process
+# and the time to the first frame and the cost of each import are reported instead.
 if __name__ == "__main__":
+    if "--startup-profile" in sys.argv:
+        startup_profile.profile_startup(os.path.abspath(__file__))
+        sys.exit(0)
+
+    init_display()
+    metrics.configure_from_environment()  # MEMORY_TEST_METRICS and friends, see metrics.py
     # No login, directly start the memory test game
     user_data = {"name": "Test User", "age": "25", "sex": "male", "email": "test@example.com", "phone": "1234567890"}  # Dummy user data
+    # Results are saved to a local SQLite file; the writes happen off the render thread
+    results = results_store.ResultsStore(os.environ.get("MEMORY_TEST_RESULTS_DB", "results.db"), station=os.environ.get("MEMORY_TEST_STATION"))
+    # MEMORY_TEST_MODE=adaptive estimates the span in fewer trials than the default level mode
+    procedure = adaptive.QuestProcedure() if os.environ.get("MEMORY_TEST_MODE") == "adaptive" else None
+    # MEMORY_TEST_PRESENTATION=auditory plays the digits through the mixer instead of showing them
+    auditory_presentation = os.environ.get("MEMORY_TEST_PRESENTATION") == "auditory"
     if start_screen():
-        memory_test(user_data)
+        profiler = metrics.start_profiler(os.environ.get("MEMORY_TEST_PROFILE"))
+        memory_test(user_data, results, procedure)
+        if profiler is not None:
+            profiler.stop()
+    results.close()
 
-pygame.quit()
+    pygame.quit()
@@ -0,0 +1,248 @@
+import bisect
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Built-in instrumentation: latency histograms and counters for the game's hot paths, exported
+# in the Prometheus text format over HTTP or as periodic JSON snapshots, plus an opt-in cProfile
+# or sampling profiler. Everything is off unless enabled; instrumented code checks
+# metrics.enabled first, so a disabled station pays one flag test per call site.
+#
+#   MEMORY_TEST_METRICS=1                    collect metrics
+#   MEMORY_TEST_METRICS_PORT=9464            serve /metrics (text) and /metrics.json
+#   MEMORY_TEST_METRICS_FILE=metrics.json    write a JSON snapshot every
+#   MEMORY_TEST_METRICS_INTERVAL=10          this many seconds
+#   MEMORY_TEST_PROFILE=cprofile:out.prof    profile the session with cProfile (pstats file), or
+#   MEMORY_TEST_PROFILE=sample:out.txt       sample the main thread's stack (collapsed stacks)
+
+enabled = False
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 30.0)
+FRAME_BUCKETS = (0.0005, 0.001, 0.002, 0.004, 0.008, 0.016, 0.033, 0.066, 0.1, 0.25)
+
+# name: (type, help, buckets)
+METRICS = {
+    "memory_test_phase_seconds": ("histogram", "Wall time spent in each game phase", TIME_BUCKETS),
+    "memory_test_frame_seconds": ("histogram", "Time to draw and present one frame", FRAME_BUCKETS),
+    "memory_test_input_seconds": ("histogram", "Time to collect one answer, by input method", TIME_BUCKETS),
+    "memory_test_calibration_seconds": ("histogram", "Microphone noise calibration time", TIME_BUCKETS),
+    "memory_test_listen_seconds": ("histogram", "Audio capture time per spoken answer", TIME_BUCKETS),
+    "memory_test_recognition_seconds": ("histogram", "Recognizer round trip per spoken answer", TIME_BUCKETS),
+    "memory_test_speech_results_total": ("counter", "Speech results by status", None),
+    "memory_test_race_wins_total": ("counter", "Recognition races won, by backend", None),
+    "memory_test_speech_circuit_total": ("counter", "Speech circuit breaker transitions, by new state", None),
+}
+
+SAMPLE_INTERVAL = 0.005
+
+_lock = threading.Lock()
+_histograms = {}  # (name, label) -> Histogram
+_counters = Counter()  # (name, label) -> count
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+# Function to record one value; label is an optional (label name, value) pair
+def observe(name, value, label=None):
+    if not enabled:
+        return
+    with _lock:
+        histogram = _histograms.get((name, label))
+        if histogram is None:
+            histogram = _histograms[(name, label)] = Histogram(METRICS[name][2])
+        histogram.observe(value)
+
+
+def increment(name, label=None, amount=1):
+    if not enabled:
+        return
+    with _lock:
+        _counters[(name, label)] += amount
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def _labels(label, extra=None):
+    pairs = ([label] if label else []) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+# Function to render every metric in the Prometheus text exposition format
+def prometheus_text():
+    with _lock:
+        histograms = {key: (list(h.counts), h.sum, h.count) for key, h in _histograms.items()}
+        counters = dict(_counters)
+
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        series = sorted((key, value) for key, value in (histograms if kind == "histogram" else counters).items() if key[0] == name)
+        if not series:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for (_, label), value in series:
+            if kind == "counter":
+                lines.append(f"{name}{_labels(label)} {value}")
+                continue
+            counts, total, count = value
+            cumulative = 0
+            for bound, bucket_count in zip(list(buckets) + ["+Inf"], counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_labels(label, ('le', bound))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(label)} {total}")
+            lines.append(f"{name}_count{_labels(label)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+# Function to get every metric as a JSON-friendly dict
+def snapshot():
+    with _lock:
+        result = {"time": time.time(), "histograms": [], "counters": []}
+        for (name, label), histogram in sorted(_histograms.items()):
+            result["histograms"].append({
+                "name": name,
+                "label": dict([label]) if label else {},
+                "buckets": list(histogram.buckets),
+                "counts": list(histogram.counts),
+                "sum": histogram.sum,
+                "count": histogram.count,
+            })
+        for (name, label), value in sorted(_counters.items()):
+            result["counters"].append({"name": name, "label": dict([label]) if label else {}, "value": value})
+    return result
+
+
+# Function to serve /metrics and /metrics.json on a background thread; returns the server
+def serve(port, host="0.0.0.0"):
+    # Imported here so stations without an exporter do not pay for http.server at startup
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = prometheus_text().encode(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, content_type = json.dumps(snapshot()).encode(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Keep scrapes out of the console
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+# Function to write a JSON snapshot to path every interval seconds on a background thread
+def write_snapshots(path, interval):
+    def run():
+        while True:
+            time.sleep(interval)
+            temporary_path = f"{path}.tmp"
+            with open(temporary_path, "w") as snapshot_file:
+                json.dump(snapshot(), snapshot_file)
+            os.replace(temporary_path, path)
+
+    threading.Thread(target=run, name="metrics-snapshots", daemon=True).start()
+
+
+# Samples the stack of one thread at a fixed interval and writes collapsed stacks
+# ("outer;inner count" lines, the input format of flame graph tools)
+class StackSampler:
+    def __init__(self, path, interval=SAMPLE_INTERVAL, thread_id=None):
+        self.path = path
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        with open(self.path, "w") as output:
+            for stack, count in self.stacks.most_common():
+                output.write(f"{stack} {count}\n")
+
+
+class _CProfiler:
+    def __init__(self, path):
+        import cProfile
+        self.path = path
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        self.profile.dump_stats(self.path)
+
+
+# Function to start the profiler described by spec ("cprofile:path" or "sample:path");
+# returns an object whose stop() writes the profile, or None when spec is empty
+def start_profiler(spec):
+    if not spec:
+        return None
+    kind, _, path = spec.partition(":")
+    if kind == "cprofile":
+        profiler = _CProfiler(path or "session.prof")
+    elif kind == "sample":
+        profiler = StackSampler(path or "session_stacks.txt")
+    else:
+        raise ValueError(f"Unknown profiler: {kind}")
+    profiler.start()
+    return profiler
+
+
+# Function to enable metrics and start the exporters selected by the station configuration
+def configure_from_environment():
+    global enabled
+    enabled = os.environ.get("MEMORY_TEST_METRICS", "") not in ("", "0")
+    if not enabled:
+        return
+    if os.environ.get("MEMORY_TEST_METRICS_PORT"):
+        serve(int(os.environ["MEMORY_TEST_METRICS_PORT"]))
+    if os.environ.get("MEMORY_TEST_METRICS_FILE"):
+        write_snapshots(os.environ["MEMORY_TEST_METRICS_FILE"], float(os.environ.get("MEMORY_TEST_METRICS_INTERVAL", "10")))
@@ -0,0 +1,117 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the Google Web Speech endpoint, for testing request deadlines and the
+# circuit breaker without network access. It answers the same POST the google backend sends
+# with a fixed transcript, after a configurable latency, and fails a configurable share of
+# requests with an HTTP error or by hanging. The settings are plain attributes and can be
+# changed while it runs, e.g. to simulate an outage and a recovery during a load test.
+#
+#   python mock_speech_service.py --latency 0.05 --error-rate 0.2
+#   MEMORY_TEST_SPEECH_URL=http://127.0.0.1:8766/speech-api/v2/recognize python memory_test.py
+
+DEFAULT_PORT = 8766
+PATH = "/speech-api/v2/recognize"
+
+
+class MockSpeechService:
+    # latency is the base response time in seconds and jitter a uniform extra on top of it;
+    # error_rate of requests get error_status, hang_rate are held for hang_seconds first
+    def __init__(self, transcript="one two three", latency=0.05, jitter=0.0, error_rate=0.0, hang_rate=0.0,
+                 hang_seconds=30.0, error_status=503, seed=None):
+        self.transcript = transcript
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.error_status = error_status
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.connections = 0  # TCP connections accepted, to check that clients reuse them
+        self._lock = threading.Lock()
+        self._server = None
+
+    # Function to start serving on a background thread; returns the endpoint URL
+    def start(self, host="127.0.0.1", port=0):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like the real service
+
+            def setup(self):
+                super().setup()
+                with service._lock:
+                    service.connections += 1
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path.split("?")[0] != PATH:
+                    self._reply(404, b"")
+                    return
+                status, body = service.respond()
+                self._reply(status, body)
+
+            def _reply(self, status, body):
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True  # The client gave up on this request
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="mock-speech", daemon=True).start()
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{PATH}"
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # Function to decide one request's outcome and wait out its latency; returns (status, body)
+    def respond(self):
+        with self._lock:
+            self.requests += 1
+            roll = self.rng.random()
+            delay = self.latency + self.rng.uniform(0, self.jitter)
+        if roll < self.hang_rate:
+            time.sleep(self.hang_seconds)
+            delay = 0.0
+        time.sleep(delay)
+        if self.hang_rate <= roll < self.hang_rate + self.error_rate:
+            return self.error_status, b""
+        result = {"result": [{"alternative": [{"transcript": self.transcript, "confidence": 0.9}], "final": True}], "result_index": 0}
+        return 200, ('{"result":[]}\n' + json.dumps(result) + "\n").encode()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a mock speech recognition endpoint.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--transcript", default="one two three")
+    parser.add_argument("--latency", type=float, default=0.05, help="base response time in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="uniform extra response time in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with an HTTP error")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="share of requests held for --hang-seconds")
+    parser.add_argument("--hang-seconds", type=float, default=30.0)
+    args = parser.parse_args()
+
+    service = MockSpeechService(args.transcript, args.latency, args.jitter, args.error_rate, args.hang_rate, args.hang_seconds)
+    url = service.start(args.host, args.port)
+    print(f"Mock speech service at {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        service.stop()
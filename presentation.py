@@ -0,0 +1,87 @@
+import statistics
+import time
+
+# Stimulus timing for the sequence display. Phase changes are scheduled against a monotonic
+# high-resolution clock; GameFlow chains every deadline from the previous scheduled one, so a
+# late flip shortens the next interval instead of pushing the rest of the sequence back.
+
+clock = time.perf_counter
+# Set while replaying a recorded session on a virtual clock (session_log.Replayer): waits jump
+# the clock forward instead of sleeping
+advance_clock = None
+
+# How early the loop wakes up before a stimulus change to draw the next frame ahead of time
+PRESENTATION_LEAD = 0.005
+# Below this the wait spins instead of sleeping, to get past scheduler wake-up jitter
+SPIN_THRESHOLD = 0.002
+
+
+# Function to return as close as possible to the deadline (a clock() value)
+def wait_until(deadline):
+    if advance_clock is not None:
+        advance_clock(deadline)
+        return
+    while True:
+        remaining = deadline - clock()
+        if remaining <= 0:
+            return
+        if remaining > SPIN_THRESHOLD:
+            time.sleep(remaining - SPIN_THRESHOLD)
+
+
+# Where the "actual" times in a PresentationLog come from by default
+FLIP_TIMING = "measured: clock read right after each display flip"
+
+
+# Records the scheduled and actual flip-on / flip-off time of every digit shown in a session.
+# timing says how the actual times were obtained; it is reported with the statistics.
+class PresentationLog:
+    def __init__(self, timing=FLIP_TIMING):
+        self.records = []
+        self.timing = timing
+
+    def clear(self):
+        self.records = []
+
+    def digit_on(self, level, trial, position, digit, scheduled, flipped):
+        self.records.append({
+            "level": level,
+            "trial": trial,
+            "position": position,
+            "digit": digit,
+            "scheduled_on": scheduled,
+            "flip_on": flipped,
+            "scheduled_off": None,
+            "flip_off": None,
+        })
+
+    def digit_off(self, scheduled, flipped):
+        if self.records and self.records[-1]["flip_off"] is None:
+            self.records[-1]["scheduled_off"] = scheduled
+            self.records[-1]["flip_off"] = flipped
+
+    # Function to summarize onset/offset errors and on-screen durations, in milliseconds
+    def statistics(self):
+        complete = [record for record in self.records if record["flip_off"] is not None]
+        if not complete:
+            return {"digits": 0, "timing": self.timing}
+
+        onset_errors = [(r["flip_on"] - r["scheduled_on"]) * 1000 for r in complete]
+        offset_errors = [(r["flip_off"] - r["scheduled_off"]) * 1000 for r in complete]
+        durations = [(r["flip_off"] - r["flip_on"]) * 1000 for r in complete]
+        duration_errors = [
+            ((r["flip_off"] - r["flip_on"]) - (r["scheduled_off"] - r["scheduled_on"])) * 1000 for r in complete
+        ]
+        return {
+            "digits": len(complete),
+            "onset_error_mean_ms": statistics.fmean(onset_errors),
+            "onset_error_max_ms": max(onset_errors, key=abs),
+            "offset_error_mean_ms": statistics.fmean(offset_errors),
+            "offset_error_max_ms": max(offset_errors, key=abs),
+            "duration_mean_ms": statistics.fmean(durations),
+            "duration_min_ms": min(durations),
+            "duration_max_ms": max(durations),
+            "duration_error_max_ms": max(duration_errors, key=abs),
+            "jitter_sd_ms": statistics.pstdev(duration_errors),
+            "timing": self.timing,
+        }
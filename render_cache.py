@@ -0,0 +1,142 @@
+import pygame
+from collections import OrderedDict
+
+# Maximum number of rendered text surfaces kept in memory
+TEXT_CACHE_SIZE = 256
+
+# Backgrounds are built once per display mode and reused for every frame
+_backgrounds = {}
+_text_cache = OrderedDict()
+
+
+# Function to build the vertical gradient used by memory_test.py
+def _build_gradient(size, base_color):
+    width, height = size
+    surface = pygame.Surface(size)
+    for i in range(height):
+        # Clamp color values to the range of 0-255
+        r = max(0, min(255, base_color[0] - i // 5))
+        g = max(0, min(255, base_color[1] - i // 10))
+        b = max(0, min(255, base_color[2]))
+        pygame.draw.line(surface, (r, g, b), (0, i), (width, i))
+    return surface
+
+
+# Function to build the flat fill used by memoer.py
+def _build_flat(size, color):
+    surface = pygame.Surface(size)
+    surface.fill(color)
+    return surface
+
+
+_builders = {
+    "gradient": _build_gradient,
+    "flat": _build_flat,
+}
+
+
+# Function to get the background surface for the current display mode, building it on first use
+def get_background(screen, style, color):
+    key = (style, color, screen.get_size(), screen.get_bitsize())
+    background = _backgrounds.get(key)
+    if background is None:
+        background = _builders[style](screen.get_size(), color).convert(screen)
+        _backgrounds[key] = background
+    return background
+
+
+# Function to drop cached backgrounds, e.g. after the display has been re-created
+def clear_background_cache():
+    _backgrounds.clear()
+
+
+# Function to render text through a bounded LRU cache keyed on (font, text, color)
+def render_text(font, text, color):
+    key = (font, text, color)
+    surface = _text_cache.get(key)
+    if surface is not None:
+        _text_cache.move_to_end(key)
+        return surface
+
+    surface = font.render(text, True, color)
+    _text_cache[key] = surface
+    if len(_text_cache) > TEXT_CACHE_SIZE:
+        _text_cache.popitem(last=False)
+    return surface
+
+
+# Draws frames on top of a cached background and pushes only the changed regions to the display.
+# Drawing calls are recorded between begin_frame() and end_frame(); a frame identical to the
+# previous one is not redrawn at all. end_frame() is prepare_frame() followed by present_frame(),
+# so time-critical callers can draw ahead and only push the update when it is due.
+class ScreenRenderer:
+    def __init__(self, screen, style, color):
+        self.screen = screen
+        self.style = style
+        self.color = color
+        self._operations = []
+        self._previous_operations = None
+        self._previous_rects = []
+        self._pending_update = None
+        self._mode = None
+
+    @property
+    def background(self):
+        return get_background(self.screen, self.style, self.color)
+
+    # Force the next frame to repaint and flip the whole screen
+    def invalidate(self):
+        self._previous_operations = None
+
+    def begin_frame(self):
+        self._operations = []
+
+    def blit(self, surface, position):
+        rect = pygame.Rect(position, surface.get_size())
+        self._operations.append(("blit", surface, rect))
+        return rect
+
+    def draw_rect(self, color, rect, border_radius=0):
+        rect = pygame.Rect(rect)
+        self._operations.append(("rect", color, rect, border_radius))
+        return rect
+
+    def end_frame(self):
+        if self.prepare_frame():
+            self.present_frame()
+
+    # Function to draw the recorded frame into the screen surface without showing it yet;
+    # returns False when the frame is identical to the previous one
+    def prepare_frame(self):
+        mode = (self.screen.get_size(), self.screen.get_bitsize())
+        full_redraw = self._previous_operations is None or mode != self._mode
+        if not full_redraw and self._operations == self._previous_operations:
+            return False
+
+        background = self.background
+        if full_redraw:
+            self.screen.blit(background, (0, 0))
+        else:
+            # Restore the background only where the previous frame drew something
+            for rect in self._previous_rects:
+                self.screen.blit(background, rect, rect)
+
+        rects = []
+        for operation in self._operations:
+            if operation[0] == "blit":
+                rects.append(self.screen.blit(operation[1], operation[2]))
+            else:
+                rects.append(pygame.draw.rect(self.screen, operation[1], operation[2], border_radius=operation[3]))
+
+        self._pending_update = None if full_redraw else self._previous_rects + rects
+        self._previous_operations = self._operations
+        self._previous_rects = rects
+        self._mode = mode
+        return True
+
+    # Function to show the prepared frame
+    def present_frame(self):
+        if self._pending_update is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self._pending_update)
@@ -0,0 +1,204 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageDraw
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.pdfgen import canvas
+
+# Per-participant PDF reports built from the results store (results_store.py). Pages are drawn
+# straight onto the canvas and closed with showPage() as soon as they are full, instead of
+# building a whole document story first; charts are rendered once with Pillow and reused from an
+# on-disk cache keyed by their data. Batch mode spreads participants over worker processes.
+
+CHART_SIZE = (900, 360)
+CHART_CACHE_DIR = "report_cache"
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+MARGIN = 2 * cm
+
+_connection = None  # Read-only connection per worker process
+
+
+def _open(database):
+    global _connection
+    _connection = sqlite3.connect(f"file:{database}?mode=ro", uri=True)
+
+
+# Function to load everything one report needs for a participant
+def load_participant(user_key):
+    participant = _connection.execute(
+        "SELECT name, age, sex, email FROM participants WHERE user_key = ?", (user_key,)
+    ).fetchone() or (user_key, None, None, None)
+    sessions = _connection.execute(
+        "SELECT started_at, score, level_reached, completed, span_estimate, span_sd, presentation FROM sessions "
+        "WHERE user_key = ? AND finished_at IS NOT NULL ORDER BY started_at",
+        (user_key,),
+    ).fetchall()
+    span = _connection.execute(
+        "SELECT length(t.sequence), SUM(t.correct), COUNT(*) FROM trials t JOIN sessions s USING (session_id) "
+        "WHERE s.user_key = ? GROUP BY length(t.sequence) ORDER BY 1",
+        (user_key,),
+    ).fetchall()
+    positions = _connection.execute(
+        "SELECT r.position, COUNT(*) - SUM(r.correct), COUNT(*) FROM responses r "
+        "JOIN trials t USING (trial_id) JOIN sessions s USING (session_id) "
+        "WHERE s.user_key = ? GROUP BY r.position ORDER BY 1",
+        (user_key,),
+    ).fetchall()
+    return {"user_key": user_key, "participant": participant, "sessions": sessions, "span": span, "positions": positions}
+
+
+# Function to draw a simple line or bar chart with Pillow and return the PNG path, reusing a
+# cached image when the same chart has been drawn before
+def chart_image(kind, title, labels, values, max_value=None):
+    key = hashlib.sha1(json.dumps([kind, title, labels, values, max_value]).encode()).hexdigest()
+    path = os.path.join(CHART_CACHE_DIR, f"{key}.png")
+    if os.path.exists(path):
+        return path
+
+    width, height = CHART_SIZE
+    left, right, top, bottom = 60, 20, 40, 40
+    image = Image.new("RGB", CHART_SIZE, "white")
+    draw = ImageDraw.Draw(image)
+    draw.text((left, 10), title, fill=(0, 0, 128))
+    draw.line((left, top, left, height - bottom), fill="black")
+    draw.line((left, height - bottom, width - right, height - bottom), fill="black")
+
+    max_value = max_value or max(values + [1])
+    plot_width = width - left - right
+    plot_height = height - top - bottom
+    step = plot_width / max(1, len(values))
+    points = []
+    for index, (label, value) in enumerate(zip(labels, values)):
+        x = left + step * index + step / 2
+        y = height - bottom - plot_height * value / max_value
+        if kind == "bar":
+            draw.rectangle((x - step * 0.3, y, x + step * 0.3, height - bottom), fill=(173, 216, 230), outline=(0, 0, 128))
+        points.append((x, y))
+        if len(labels) <= 30 or index % (len(labels) // 30 + 1) == 0:
+            draw.text((x - 6, height - bottom + 8), str(label), fill="black")
+    if kind == "line":
+        if len(points) > 1:
+            draw.line(points, fill=(0, 0, 128), width=3)
+        for x, y in points:
+            draw.ellipse((x - 4, y - 4, x + 4, y + 4), fill=(0, 0, 128))
+    draw.text((8, top - 6), f"{max_value:g}", fill="black")
+    draw.text((8, height - bottom - 6), "0", fill="black")
+
+    os.makedirs(CHART_CACHE_DIR, exist_ok=True)
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    image.save(temporary_path, "PNG")
+    os.replace(temporary_path, path)  # Atomic, so parallel workers never read a half-written chart
+    return path
+
+
+# Writes lines top to bottom, starting a new page whenever the current one is full
+class PageWriter:
+    def __init__(self, pdf):
+        self.pdf = pdf
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def need(self, height):
+        if self.y - height < MARGIN:
+            self.pdf.showPage()
+            self.y = PAGE_HEIGHT - MARGIN
+
+    def text(self, line, size=10, font="Helvetica", gap=4):
+        self.need(size + gap)
+        self.pdf.setFont(font, size)
+        self.pdf.drawString(MARGIN, self.y - size, line)
+        self.y -= size + gap
+
+    def image(self, path):
+        width = PAGE_WIDTH - 2 * MARGIN
+        height = width * CHART_SIZE[1] / CHART_SIZE[0]
+        self.need(height + 10)
+        self.pdf.drawImage(path, MARGIN, self.y - height, width, height)
+        self.y -= height + 10
+
+
+# Function to write one participant's report
+def write_report(data, path):
+    name, age, sex, email = data["participant"]
+    sessions = data["sessions"]
+    pdf = canvas.Canvas(path, pagesize=A4)
+    pdf.setTitle(f"Memory Test report - {name or data['user_key']}")
+    page = PageWriter(pdf)
+
+    page.text("Memory Test report", size=20, font="Helvetica-Bold", gap=12)
+    page.text(f"Participant: {name or ''}   Age: {age or ''}   Sex: {sex or ''}   Email: {email or ''}")
+    scores = [score for _, score, *_ in sessions]
+    if scores:
+        page.text(f"Sessions: {len(scores)}   Best score: {max(scores)}   Mean score: {sum(scores) / len(scores):.1f}")
+    else:
+        page.text("No finished sessions.")
+    page.text("")
+
+    if sessions:
+        page.image(chart_image("line", "Score per session", list(range(1, len(scores) + 1)), scores))
+
+    if data["span"]:
+        lengths = [length for length, _, _ in data["span"]]
+        accuracy = [round(correct / total, 3) for _, correct, total in data["span"]]
+        page.image(chart_image("bar", "Proportion correct by sequence length (span per level)", lengths, accuracy, 1.0))
+
+    if data["positions"]:
+        positions = [position + 1 for position, _, _ in data["positions"]]
+        errors = [round(wrong / total, 3) for _, wrong, total in data["positions"]]
+        page.image(chart_image("bar", "Error rate by serial position", positions, errors, 1.0))
+
+    page.text("Session history", size=14, font="Helvetica-Bold", gap=8)
+    for started_at, score, level_reached, completed, span_estimate, span_sd, presentation in sessions:
+        date = time.strftime("%Y-%m-%d %H:%M", time.localtime(started_at))
+        status = "" if completed else "  (aborted)"
+        if presentation != "visual":
+            status = f"  ({presentation}){status}"
+        if span_estimate is not None:
+            page.text(f"{date}   span {span_estimate:.1f} +/- {span_sd:.1f} (adaptive){status}")
+        else:
+            page.text(f"{date}   score {score}   level reached {level_reached}{status}")
+
+    pdf.showPage()
+    pdf.save()
+
+
+def _safe_name(user_key):
+    return "".join(char if char.isalnum() or char in "-_.@" else "_" for char in user_key)
+
+
+# Function run in each worker: build one report and return its path
+def _report_for(user_key, output_dir):
+    path = os.path.join(output_dir, f"{_safe_name(user_key)}.pdf")
+    write_report(load_participant(user_key), path)
+    return path
+
+
+# Function to generate reports for the given participants (all of them by default)
+def generate_reports(database, output_dir, user_keys=None, processes=None):
+    os.makedirs(output_dir, exist_ok=True)
+    if user_keys is None:
+        _open(database)
+        user_keys = [row[0] for row in _connection.execute("SELECT DISTINCT user_key FROM sessions ORDER BY user_key")]
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=_open, initargs=(database,)) as pool:
+        chunksize = max(1, len(user_keys) // ((processes or os.cpu_count() or 1) * 4))
+        return list(pool.map(_report_for, user_keys, [output_dir] * len(user_keys), chunksize=chunksize))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate per-participant PDF reports from the results store.")
+    parser.add_argument("database", nargs="?", default=os.environ.get("MEMORY_TEST_RESULTS_DB", "results.db"))
+    parser.add_argument("--output", default="reports")
+    parser.add_argument("--user", action="append", dest="users", help="only this participant (repeatable)")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    paths = generate_reports(args.database, args.output, args.users, args.processes)
+    print(f"Wrote {len(paths)} reports to {args.output} in {time.perf_counter() - started:.1f}s")
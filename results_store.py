@@ -0,0 +1,258 @@
+import json
+import queue
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+# Local SQLite store for sessions, trials and per-digit responses. Writes are queued and
+# committed in batches by a background thread, so saving never stalls a frame; reads use their
+# own connection, which WAL mode lets run alongside the writer.
+
+# A batch is committed when it reaches this many writes or this age in seconds
+BATCH_SIZE = 200
+BATCH_INTERVAL = 0.5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS participants (
+    user_key TEXT PRIMARY KEY,
+    name TEXT,
+    age TEXT,
+    sex TEXT,
+    email TEXT,
+    phone TEXT
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    user_key TEXT NOT NULL,
+    station TEXT,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    score INTEGER,
+    level_reached INTEGER,
+    completed INTEGER,
+    span_estimate REAL,
+    span_sd REAL,
+    presentation TEXT NOT NULL DEFAULT 'visual',
+    presentation_timing TEXT
+);
+CREATE TABLE IF NOT EXISTS trials (
+    trial_id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    trial_index INTEGER NOT NULL,
+    sequence TEXT NOT NULL,
+    response TEXT,
+    correct INTEGER NOT NULL,
+    answered_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS responses (
+    trial_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    expected INTEGER NOT NULL,
+    given INTEGER,
+    correct INTEGER NOT NULL,
+    PRIMARY KEY (trial_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sessions_by_user ON sessions (user_key, started_at);
+CREATE INDEX IF NOT EXISTS sessions_by_date ON sessions (started_at);
+CREATE INDEX IF NOT EXISTS sessions_by_user_score ON sessions (user_key, score);
+CREATE INDEX IF NOT EXISTS trials_by_session ON trials (session_id, trial_id);
+"""
+
+# Columns added to sessions after the first release: (name, type); older stores get them on open
+SESSION_COLUMNS = [("span_estimate", "REAL"), ("span_sd", "REAL"), ("presentation", "TEXT NOT NULL DEFAULT 'visual'"),
+                   ("presentation_timing", "TEXT")]
+
+
+# Function to get the key a participant is stored under
+def user_key(user_data):
+    return user_data.get("email") or user_data.get("name") or "anonymous"
+
+
+# Function to build one responses row per position of the sequence
+def _digit_rows(trial_id, sequence, response):
+    rows = []
+    for position, expected in enumerate(sequence):
+        given = response[position] if position < len(response) else ""
+        given = int(given) if given and given in "0123456789" else None  # Not isdigit(), which accepts "²"
+        rows.append((trial_id, position, expected, given, int(given == expected)))
+    return rows
+
+
+class ResultsStore:
+    def __init__(self, path="results.db", station=None):
+        self.path = path
+        self.station = station
+        connection = self._connect()
+        connection.executescript(SCHEMA)
+        existing = {row[1] for row in connection.execute("PRAGMA table_info(sessions)")}
+        for column, column_type in SESSION_COLUMNS:
+            if column not in existing:
+                connection.execute(f"ALTER TABLE sessions ADD COLUMN {column} {column_type}")
+        connection.commit()
+        connection.close()
+
+        self._writes = queue.Queue()
+        self._read_connection = self._connect(check_same_thread=False)
+        self._read_lock = threading.Lock()
+        self._writer = threading.Thread(target=self._write_loop, name="results-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self, check_same_thread=True):
+        connection = sqlite3.connect(self.path, check_same_thread=check_same_thread)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    # Function to record the start of a session; returns its id straight away. presentation is
+    # how the digits were given: "visual" or "auditory".
+    def start_session(self, user_data, started_at=None, presentation="visual"):
+        session_id = uuid.uuid4().hex
+        self._writes.put(("session", session_id, dict(user_data), started_at or time.time(), presentation))
+        return session_id
+
+    def record_trial(self, session_id, level, trial_index, sequence, response, correct, answered_at=None):
+        self._writes.put(("trial", session_id, level, trial_index, list(sequence), response, correct, answered_at or time.time()))
+
+    # span_estimate and span_sd are the adaptive mode's span estimate and its standard deviation;
+    # presentation_timing is the session's presentation.PresentationLog.statistics(), kept as JSON
+    def finish_session(self, session_id, score, level_reached, completed=True, finished_at=None, span_estimate=None, span_sd=None,
+                       presentation_timing=None):
+        self._writes.put(("finish", session_id, score, level_reached, completed, finished_at or time.time(), span_estimate, span_sd,
+                          presentation_timing))
+
+    # Function to wait until everything queued so far has been committed
+    def flush(self):
+        done = threading.Event()
+        self._writes.put(("flush", done))
+        done.wait()
+
+    def close(self):
+        self.flush()
+        self._writes.put(None)
+        self._writer.join()
+        self._read_connection.close()
+
+    def _write_loop(self):
+        connection = self._connect()
+        batch = []
+        batch_started = None
+        while True:
+            timeout = None if not batch else max(0.0, batch_started + BATCH_INTERVAL - time.monotonic())
+            try:
+                item = self._writes.get(timeout=timeout)
+            except queue.Empty:
+                item = "commit"
+
+            if item is None:
+                self._commit(connection, batch)
+                connection.close()
+                return
+            if item == "commit" or item[0] == "flush":
+                self._commit(connection, batch)
+                batch = []
+                if item != "commit":
+                    item[1].set()
+                continue
+
+            if not batch:
+                batch_started = time.monotonic()
+            batch.append(item)
+            if len(batch) >= BATCH_SIZE:
+                self._commit(connection, batch)
+                batch = []
+
+    # Function to commit a batch. Each write has its own savepoint, so one that fails is logged
+    # and dropped without losing the rest of the batch; if the commit itself fails the batch is
+    # dropped. Either way the writer keeps running and flush() and close() still return.
+    def _commit(self, connection, batch):
+        if not batch:
+            return
+        try:
+            with connection:
+                connection.execute("BEGIN")
+                for item in batch:
+                    connection.execute("SAVEPOINT item")
+                    try:
+                        self._write(connection, item)
+                    except Exception as error:
+                        connection.execute("ROLLBACK TO item")
+                        print(f"Could not save {item[0]} result: {error!r}", file=sys.stderr)
+                    connection.execute("RELEASE item")
+        except Exception as error:
+            print(f"Could not save {len(batch)} results: {error!r}", file=sys.stderr)
+
+    def _write(self, connection, item):
+        if item[0] == "session":
+            _, session_id, user_data, started_at, presentation = item
+            key = user_key(user_data)
+            connection.execute(
+                "INSERT INTO participants (user_key, name, age, sex, email, phone) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (user_key) DO UPDATE SET name = excluded.name, age = excluded.age, "
+                "sex = excluded.sex, email = excluded.email, phone = excluded.phone",
+                (key, user_data.get("name"), user_data.get("age"), user_data.get("sex"), user_data.get("email"), user_data.get("phone")),
+            )
+            connection.execute(
+                "INSERT INTO sessions (session_id, user_key, station, started_at, presentation) VALUES (?, ?, ?, ?, ?)",
+                (session_id, key, self.station, started_at, presentation),
+            )
+        elif item[0] == "trial":
+            _, session_id, level, trial_index, sequence, response, correct, answered_at = item
+            cursor = connection.execute(
+                "INSERT INTO trials (session_id, level, trial_index, sequence, response, correct, answered_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (session_id, level, trial_index, "".join(map(str, sequence)), response, int(correct), answered_at),
+            )
+            connection.executemany(
+                "INSERT INTO responses (trial_id, position, expected, given, correct) VALUES (?, ?, ?, ?, ?)",
+                _digit_rows(cursor.lastrowid, sequence, response or ""),
+            )
+        elif item[0] == "finish":
+            _, session_id, score, level_reached, completed, finished_at, span_estimate, span_sd, timing = item
+            connection.execute(
+                "UPDATE sessions SET finished_at = ?, score = ?, level_reached = ?, completed = ?, span_estimate = ?, span_sd = ?, "
+                "presentation_timing = ? WHERE session_id = ?",
+                (finished_at, score, level_reached, int(completed), span_estimate, span_sd,
+                 None if timing is None else json.dumps(timing), session_id),
+            )
+
+    def _query(self, sql, parameters):
+        with self._read_lock:
+            return self._read_connection.execute(sql, parameters).fetchall()
+
+    # Function to get a participant's most recent sessions, newest first
+    def user_history(self, user_data, limit=50):
+        return self._query(
+            "SELECT session_id, started_at, finished_at, score, level_reached, completed, span_estimate, span_sd, presentation FROM sessions "
+            "WHERE user_key = ? ORDER BY started_at DESC LIMIT ?",
+            (user_key(user_data), limit),
+        )
+
+    # Function to get the presentation timing statistics saved with a session (None if there are none)
+    def presentation_timing(self, session_id):
+        rows = self._query("SELECT presentation_timing FROM sessions WHERE session_id = ?", (session_id,))
+        return json.loads(rows[0][0]) if rows and rows[0][0] is not None else None
+
+    # Function to get the trials of one session in the order they were played
+    def session_trials(self, session_id):
+        return self._query(
+            "SELECT level, trial_index, sequence, response, correct, answered_at FROM trials "
+            "WHERE session_id = ? ORDER BY trial_id",
+            (session_id,),
+        )
+
+    # Function to get the best score per participant, optionally only for sessions since a time
+    def leaderboard(self, limit=10, since=None):
+        if since is None:
+            return self._query(
+                "SELECT user_key, MAX(score) AS best FROM sessions WHERE score IS NOT NULL "
+                "GROUP BY user_key ORDER BY best DESC LIMIT ?",
+                (limit,),
+            )
+        return self._query(
+            "SELECT user_key, MAX(score) AS best FROM sessions WHERE started_at >= ? AND score IS NOT NULL "
+            "GROUP BY user_key ORDER BY best DESC LIMIT ?",
+            (since, limit),
+        )
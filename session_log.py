@@ -0,0 +1,307 @@
+import argparse
+import os
+import struct
+import threading
+import time
+
+import pygame
+
+import game_loop
+import presentation
+
+# Record and replay of whole sessions. A recording is a compact append-only binary log holding
+# the RNG seed, every batch of events handed to a screen (with its time on the session clock),
+# every speech result the game polled and every clock reading a timing decision was based on
+# (see game_loop.session_clock()). Sequences, answers and timing decisions depend on nothing else, so replaying the log drives the game through exactly the same session, headless
+# or on screen, at real speed or as fast as possible.
+#
+# File layout (little-endian):
+#   header  b"MTSL", version u8, mode u8 (0 levels, 1 adaptive), seed u64, wall start f64
+#   record  kind u8, session time f64, then
+#     BATCH   screen u32, count u16, count x event
+#     SPEECH  status (u8 length + UTF-8, empty for "no result"), text (u16 length + UTF-8,
+#             length 0xFFFF for no text)
+#     CLOCK   nothing; the record's time is the clock reading
+#   event   type u32, form u8, then nothing (form 0), key i32 + mod u16 + unicode (form 1)
+#           or x i16 + y i16 + button u8 (form 2)
+
+MAGIC = b"MTSL"
+VERSION = 2
+MODES = ("levels", "adaptive")
+
+HEADER = struct.Struct("<4sBBQd")
+RECORD = struct.Struct("<Bd")
+BATCH = struct.Struct("<IH")
+EVENT = struct.Struct("<IB")
+KEY = struct.Struct("<iH")
+MOUSE = struct.Struct("<hhB")
+
+BATCH_RECORD = 1
+SPEECH_RECORD = 2
+CLOCK_RECORD = 3
+
+PLAIN_EVENT = 0
+KEY_EVENT = 1
+MOUSE_EVENT = 2
+
+NO_TEXT = 0xFFFF  # Text length marking "no text" in SPEECH records
+
+
+class ReplayDiverged(Exception):
+    pass
+
+
+def _pack_text(text, length_format):
+    if text is None and length_format == "<H":
+        return struct.pack(length_format, NO_TEXT)
+    data = (text or "").encode("utf-8")
+    return struct.pack(length_format, len(data)) + data
+
+
+def _unpack_text(data, offset, length_format):
+    (length,) = struct.unpack_from(length_format, data, offset)
+    offset += struct.calcsize(length_format)
+    if length == NO_TEXT and length_format == "<H":
+        return None, offset
+    return data[offset:offset + length].decode("utf-8"), offset + length
+
+
+def _pack_event(event):
+    if hasattr(event, "key"):
+        return (EVENT.pack(event.type, KEY_EVENT) + KEY.pack(event.key, getattr(event, "mod", 0) & 0xFFFF)
+                + _pack_text(getattr(event, "unicode", ""), "<B"))
+    if hasattr(event, "button") and hasattr(event, "pos"):
+        return EVENT.pack(event.type, MOUSE_EVENT) + MOUSE.pack(event.pos[0], event.pos[1], event.button)
+    return EVENT.pack(event.type, PLAIN_EVENT)
+
+
+def _unpack_event(data, offset):
+    event_type, form = EVENT.unpack_from(data, offset)
+    offset += EVENT.size
+    if form == KEY_EVENT:
+        key, mod = KEY.unpack_from(data, offset)
+        unicode, offset = _unpack_text(data, offset + KEY.size, "<B")
+        return pygame.event.Event(event_type, key=key, mod=mod, unicode=unicode), offset
+    if form == MOUSE_EVENT:
+        x, y, button = MOUSE.unpack_from(data, offset)
+        return pygame.event.Event(event_type, pos=(x, y), button=button), offset + MOUSE.size
+    return pygame.event.Event(event_type), offset
+
+
+# Appends one session to a log file. origin is the session clock value (presentation.clock())
+# the session started at; record times are stored relative to it.
+class Recorder:
+    def __init__(self, path, seed, origin, mode="levels"):
+        self.origin = origin
+        self._screens = 0
+        self._lock = threading.Lock()
+        self._file = open(path, "ab")
+        self._file.write(HEADER.pack(MAGIC, VERSION, MODES.index(mode), seed, time.time()))
+        self._file.flush()
+
+    # Function to number the next screen; batches are tagged with it so a replay can spot divergence
+    def start_screen(self):
+        self._screens += 1
+        return self._screens
+
+    def batch(self, screen, events):
+        body = b"".join(_pack_event(event) for event in events)
+        self._write(BATCH_RECORD, BATCH.pack(screen, len(events)) + body)
+
+    # Function to record what a speech poll returned: (status, text) or None
+    def speech(self, result):
+        status, text = result if result is not None else ("", None)
+        self._write(SPEECH_RECORD, _pack_text(status, "<B") + _pack_text(text, "<H"))
+
+    # Function to record a clock reading (a presentation.clock() value) the game acted on
+    def clock_reading(self, now):
+        self._write(CLOCK_RECORD, b"", now)
+
+    def _write(self, kind, body, now=None):
+        if now is None:
+            now = presentation.clock()
+        with self._lock:
+            # Flushed per record, so a crash leaves everything up to the crash in the log
+            self._file.write(RECORD.pack(kind, now - self.origin) + body)
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+# Function to read a log into (header dict, batches, speech results, clock readings); batches are
+# (time, screen, events)
+def read_log(path):
+    with open(path, "rb") as log:
+        data = log.read()
+    magic, version, mode, seed, wall_start = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} session log")
+    header = {"mode": MODES[mode], "seed": seed, "wall_start": wall_start}
+
+    batches = []
+    speech = []
+    clocks = []
+    offset = HEADER.size
+    while offset + RECORD.size <= len(data):
+        kind, at = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        try:
+            if kind == BATCH_RECORD:
+                screen, count = BATCH.unpack_from(data, offset)
+                offset += BATCH.size
+                events = []
+                for _ in range(count):
+                    event, offset = _unpack_event(data, offset)
+                    events.append(event)
+                record = (at, screen, events)
+            elif kind == SPEECH_RECORD:
+                status, offset = _unpack_text(data, offset, "<B")
+                text, offset = _unpack_text(data, offset, "<H")
+                record = (status, text) if status else None
+            elif kind != CLOCK_RECORD:
+                raise ValueError(f"Unknown record kind {kind} at byte {offset}")
+        except (struct.error, UnicodeDecodeError):
+            break  # The last record was cut off mid-write; everything before it is intact
+        if offset > len(data):
+            break
+        if kind == BATCH_RECORD:
+            batches.append(record)
+        elif kind == SPEECH_RECORD:
+            speech.append(record)
+        else:
+            clocks.append(at)
+    return header, batches, speech, clocks
+
+
+# Feeds a recorded session back into the game on a virtual session clock. With realtime the
+# replay waits so that events arrive at their recorded times; otherwise time jumps straight to
+# the next event. clocks are the recorded clock readings, handed back in order.
+class Replayer:
+    def __init__(self, batches, clocks=(), realtime=False):
+        self.batches = list(reversed(batches))
+        self.clocks = list(reversed(clocks))
+        self.realtime = realtime
+        self.now = 0.0
+        self._screens = 0
+        self._wall_origin = time.perf_counter()
+
+    def clock(self):
+        return self.now
+
+    # Function to move the session clock forward to at (never backwards)
+    def advance_to(self, at):
+        if at > self.now:
+            self.now = at
+        if self.realtime:
+            delay = self._wall_origin + self.now - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def start_screen(self):
+        self._screens += 1
+        return self._screens
+
+    # Function to return the next recorded clock reading, moving the session clock up to it.
+    # Once the whole log has been used up (a truncated recording) the clock stands still.
+    def clock_reading(self):
+        if not self.clocks:
+            if self.batches:
+                raise ReplayDiverged("The game read the clock more often than was recorded")
+            return self.now
+        at = self.clocks.pop()
+        self.advance_to(at)
+        return at
+
+    # Function to get the next recorded batch for screen; once the log runs out the game is
+    # sent a QUIT so a truncated recording still ends cleanly
+    def next_events(self, screen):
+        if not self.batches:
+            return [pygame.event.Event(pygame.QUIT)]
+        at, recorded_screen, events = self.batches.pop()
+        if recorded_screen != screen:
+            raise ReplayDiverged(f"Recorded events for screen {recorded_screen} reached screen {screen} at {at:.3f}s")
+        self.advance_to(at)
+        return events
+
+
+# Stands in for speech_service.SpeechService and answers every poll from the log
+class ReplaySpeech:
+    def __init__(self, results):
+        self.results = list(reversed(results))
+        self.ready = threading.Event()
+        self.ready.set()
+        self.error = None
+        self._next_request_id = 0
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def listen(self, expected_words=None):
+        self._next_request_id += 1
+        return self._next_request_id
+
+    def check_deadline(self, request_id):
+        pass  # Late results were recorded as the SERVICE_ERROR they turned into
+
+    def poll(self, request_id):
+        if not self.results:
+            raise ReplayDiverged("The game polled for more speech results than were recorded")
+        return self.results.pop()
+
+
+# Function to build the log path for a new recording in directory
+def recording_path(directory):
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}.mtsl")
+
+
+# Function to replay a log through memory_test.memory_test(); returns (score, wall seconds)
+def replay(path, realtime=False):
+    header, batches, speech, clocks = read_log(path)
+    import adaptive
+    import memory_test
+
+    if memory_test.screen is None:
+        memory_test.init_display()
+    replayer = Replayer(batches, clocks, realtime)
+    if speech:
+        memory_test.speech = ReplaySpeech(speech)
+        memory_test.speech_thread = None
+    else:
+        # Nothing was recognized: the station had no speech stack, or the session ended before
+        # the first answer. A finished start-up thread with no service behind it makes
+        # get_speech() return None, so the replay never opens the real microphone.
+        memory_test.speech = None
+        memory_test.speech_thread = threading.Thread(target=lambda: None)
+        memory_test.speech_thread.start()
+    saved_clock = presentation.clock
+    presentation.clock = replayer.clock
+    presentation.advance_clock = replayer.advance_to
+    game_loop.replayer = replayer
+    procedure = adaptive.QuestProcedure() if header["mode"] == "adaptive" else None
+    started = time.perf_counter()
+    try:
+        score = memory_test.memory_test({}, None, procedure, seed=header["seed"])
+    finally:
+        game_loop.replayer = None
+        presentation.clock = saved_clock
+        presentation.advance_clock = None
+    return score, time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded memory test session.")
+    parser.add_argument("log")
+    parser.add_argument("--realtime", action="store_true", help="replay at the recorded speed instead of as fast as possible")
+    parser.add_argument("--headless", action="store_true", help="run on the dummy video driver")
+    args = parser.parse_args()
+    if args.headless:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+    score, seconds = replay(args.log, args.realtime)
+    print(f"Replayed {args.log}: score {score} in {seconds:.2f}s")
@@ -0,0 +1,156 @@
+import argparse
+import json
+import random
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import adaptive
+import game_core
+import game_flow
+
+# Headless simulation of whole memory test sessions with scripted players. Nothing here
+# imports pygame, so it runs on any machine and validates scoring or level-progression changes
+# against the same GameFlow the window uses.
+
+
+# Always repeats the sequence correctly
+class PerfectPlayer:
+    def __init__(self, rng):
+        self.rng = rng
+
+    def answer(self, sequence):
+        return "".join(map(str, sequence))
+
+
+# Gets each digit wrong independently with probability error_rate
+class ErrorRatePlayer:
+    def __init__(self, rng, error_rate=0.05):
+        self.rng = rng
+        self.error_rate = error_rate
+
+    def answer(self, sequence):
+        digits = []
+        for digit in sequence:
+            if self.rng.random() < self.error_rate:
+                digit = self.rng.choice([d for d in range(1, 10) if d != digit])
+            digits.append(str(digit))
+        return "".join(digits)
+
+
+# Remembers up to span digits; anything past that is a guess
+class SpanLimitedPlayer:
+    def __init__(self, rng, span=7):
+        self.rng = rng
+        self.span = int(span)
+
+    def answer(self, sequence):
+        remembered = [str(digit) for digit in sequence[:self.span]]
+        guessed = [str(self.rng.randint(1, 9)) for _ in sequence[self.span:]]
+        return "".join(remembered + guessed)
+
+
+PLAYERS = {
+    "perfect": PerfectPlayer,
+    "error_rate": ErrorRatePlayer,
+    "span_limited": SpanLimitedPlayer,
+}
+
+# Perfect players never fail, so sessions are capped at this level
+MAX_LEVEL = 30
+
+
+# Function to play one session instantly; returns (final level reached, score, trials played)
+def run_session(player, rng, adaptive_mode=False):
+    procedure = adaptive.QuestProcedure() if adaptive_mode else None
+    flow = game_flow.GameFlow(lambda length: game_core.generate_sequence(length, rng), 0.0, procedure)
+    trials = 0
+
+    def answer(sequence):
+        nonlocal trials
+        trials += 1
+        if flow.level > MAX_LEVEL:
+            flow.abort()
+        return player.answer(sequence)
+
+    game_flow.run_instantly(flow, answer)
+    return flow.level, flow.score, trials, flow.span_estimate
+
+
+# Function to run a chunk of sessions in one worker process
+def _run_chunk(player_name, player_args, sessions, seed, adaptive_mode=False):
+    rng = random.Random(seed)
+    player = PLAYERS[player_name](rng, *player_args)
+    levels = Counter()
+    scores = Counter()
+    trials = 0
+    estimates = []
+    for _ in range(sessions):
+        level, score, session_trials, span_estimate = run_session(player, rng, adaptive_mode)
+        levels[level] += 1
+        scores[score] += 1
+        trials += session_trials
+        if span_estimate is not None:
+            estimates.append(span_estimate)
+    return levels, scores, trials, estimates
+
+
+# Function to run many sessions across a process pool and summarize level and score statistics
+def run_batch(player_name, player_args=(), sessions=10000, processes=None, seed=0, chunk_size=2000, adaptive_mode=False):
+    chunks = []
+    remaining = sessions
+    while remaining > 0:
+        chunks.append(min(chunk_size, remaining))
+        remaining -= chunk_size
+
+    levels = Counter()
+    scores = Counter()
+    trials = 0
+    estimates = []
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [
+            pool.submit(_run_chunk, player_name, tuple(player_args), count, seed + index, adaptive_mode)
+            for index, count in enumerate(chunks)
+        ]
+        for future in futures:
+            chunk_levels, chunk_scores, chunk_trials, chunk_estimates = future.result()
+            levels.update(chunk_levels)
+            scores.update(chunk_scores)
+            trials += chunk_trials
+            estimates += chunk_estimates
+    elapsed = time.perf_counter() - started
+
+    summary = {
+        "player": player_name,
+        "player_args": list(player_args),
+        "mode": "adaptive" if adaptive_mode else "levels",
+        "sessions": sessions,
+        "trials": trials,
+        "mean_trials": trials / sessions,
+        "mean_score": sum(score * count for score, count in scores.items()) / sessions,
+        "mean_final_level": sum(level * count for level, count in levels.items()) / sessions,
+        "final_levels": {level: levels[level] for level in sorted(levels)},
+        "scores": {score: scores[score] for score in sorted(scores)},
+        "seconds": elapsed,
+        "sessions_per_second": sessions / elapsed if elapsed else None,
+    }
+    if estimates:
+        summary["mean_span_estimate"] = statistics.fmean(estimates)
+        summary["span_estimate_sd"] = statistics.pstdev(estimates)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run headless memory test sessions with scripted players.")
+    parser.add_argument("player", choices=sorted(PLAYERS))
+    parser.add_argument("player_args", nargs="*", type=float, help="e.g. the error rate or the span")
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--adaptive", action="store_true", help="choose lengths with the adaptive procedure")
+    args = parser.parse_args()
+
+    summary = run_batch(args.player, args.player_args, args.sessions, args.processes, args.seed, adaptive_mode=args.adaptive)
+    print(json.dumps(summary, indent=2))
@@ -0,0 +1,226 @@
+import os
+import queue
+import sys
+import threading
+import time
+
+import speech_recognition as sr
+
+import circuit_breaker
+import digit_parser
+import endpointing
+import metrics
+from speech_backends import GoogleBackend
+
+# Result statuses handed back to the game loop
+RECOGNIZED = "recognized"
+NOT_UNDERSTOOD = "not_understood"
+SERVICE_ERROR = "service_error"
+MICROPHONE_ERROR = "microphone_error"
+SERVICE_UNAVAILABLE = "service_unavailable"  # The circuit breaker is open; nothing was captured
+
+# The noise floor is measured once when the stream opens and refreshed while idle
+CALIBRATION_DURATION = 0.5
+CALIBRATION_INTERVAL = 60.0
+
+# Quarter of a second of silence sent to check whether a failed recognizer has come back
+PROBE_AUDIO = sr.AudioData(bytes(8000), 16000, 2)
+
+# Extra time the game allows on top of the request timeout before giving up on a result itself,
+# so a backend that enforces the timeout gets to report its own error first
+RESULT_GRACE = 1.0
+
+
+# Keeps one microphone stream open for the whole session and runs capture and recognition
+# on a worker thread. Recognition goes through a backend from speech_backends (Google by default). Each listen() request produces one (request_id, status, text) tuple on
+# the results queue; on_result, if given, is called from the worker after every result so the
+# game loop can wake up without polling. Recognizer failures feed a circuit breaker (see
+# circuit_breaker.py); while it is open every request is answered SERVICE_UNAVAILABLE at once.
+# Whatever the backend does, a request is answered within request_timeout (default
+# MEMORY_TEST_SPEECH_TIMEOUT) of its capture once the game calls check_deadline().
+class SpeechService:
+    def __init__(self, recognizer=None, backend=None, device_index=None, on_result=None, breaker=None, request_timeout=None):
+        self.recognizer = recognizer or sr.Recognizer()
+        self.backend = backend or GoogleBackend(self.recognizer)
+        self.device_index = device_index
+        self.on_result = on_result
+        self.breaker = breaker or circuit_breaker.breaker_from_environment(self._probe)
+        self.request_timeout = (request_timeout or float(os.environ.get("MEMORY_TEST_SPEECH_TIMEOUT", "0"))
+                                or GoogleBackend.REQUEST_TIMEOUT)
+        # Unanswered requests: request_id -> perf_counter() time by which the answer is due,
+        # None while the player is speaking
+        self._deadlines = {}
+        self.results = queue.Queue()
+        self.ready = threading.Event()  # Set once the stream is open and calibrated (or failed)
+        self.error = None
+        self._requests = queue.Queue()
+        self._lock = threading.Lock()
+        self._next_request_id = 0
+        self._last_calibration = None
+        self._thread = None
+
+    # Function to open the microphone in the background; safe to call more than once
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="speech-service", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._requests.put(None)
+
+    # Function to ask the worker for one spoken answer; returns the request id to poll for.
+    # With expected_words, capture ends as soon as that many words have been spoken
+    # (see endpointing.py) instead of after the recognizer's pause_threshold of silence, and
+    # the recognizer's alternative that holds that many digits is preferred (see digit_parser.py).
+    def listen(self, expected_words=None):
+        self.start()
+        with self._lock:
+            self._next_request_id += 1
+            request_id = self._next_request_id
+            if self.error is not None:
+                self._publish(request_id, MICROPHONE_ERROR, None)
+            elif self.breaker.is_open:
+                self._publish(request_id, SERVICE_UNAVAILABLE, None)
+            else:
+                # Before the stream is open the worker cannot be stuck on an earlier request
+                self._deadlines[request_id] = self._due(time.perf_counter()) if self.ready.is_set() else None
+                self._requests.put((request_id, expected_words))
+        return request_id
+
+    def _due(self, start):
+        return start + self.request_timeout + RESULT_GRACE
+
+    # Function for the game loop to give up on request_id once its deadline has passed: the
+    # request is answered SERVICE_ERROR and counts as a recognizer failure
+    def check_deadline(self, request_id):
+        with self._lock:
+            deadline = self._deadlines.get(request_id)
+        if deadline is not None and time.perf_counter() >= deadline:
+            self._finish(request_id, SERVICE_ERROR, None, healthy=False)
+
+    # Function to get the result for request_id if it has arrived; stale results are dropped
+    def poll(self, request_id):
+        while True:
+            try:
+                result_id, status, text = self.results.get_nowait()
+            except queue.Empty:
+                return None
+            if result_id == request_id:
+                return status, text
+
+    def _publish(self, request_id, status, text):
+        metrics.increment("memory_test_speech_results_total", ("status", status))
+        self.results.put((request_id, status, text))
+        if self.on_result is not None:
+            self.on_result()
+
+    def _run(self):
+        if not self.backend.needs_microphone:
+            self.ready.set()
+            self._serve(None)
+            return
+
+        try:
+            with sr.Microphone(device_index=self.device_index) as source:
+                self._calibrate(source)
+                self.ready.set()
+                self._serve(source)
+        except (AttributeError, OSError) as error:
+            # PyAudio is missing or the device could not be opened
+            with self._lock:
+                self.error = error
+                self.ready.set()
+                while True:
+                    try:
+                        request = self._requests.get_nowait()
+                    except queue.Empty:
+                        break
+                    if request is not None:
+                        self._deadlines.pop(request[0], None)
+                        self._publish(request[0], MICROPHONE_ERROR, None)
+
+    def _calibrate(self, source):
+        started = time.perf_counter()
+        self.recognizer.adjust_for_ambient_noise(source, duration=CALIBRATION_DURATION)
+        self._last_calibration = time.monotonic()
+        metrics.observe("memory_test_calibration_seconds", time.perf_counter() - started)
+
+    def _serve(self, source):
+        ring = endpointing.ring_for(source) if source is not None else None  # Reused for every answer
+        while True:
+            try:
+                request = self._requests.get(timeout=1.0)
+            except queue.Empty:
+                if source is not None and time.monotonic() - self._last_calibration >= CALIBRATION_INTERVAL:
+                    self._calibrate(source)
+                continue
+            if request is None:
+                return
+
+            request_id, expected_words = request
+            with self._lock:
+                if request_id not in self._deadlines:
+                    continue  # The game gave up on it while it was queued
+                self._deadlines[request_id] = None
+            if self.breaker.is_open:
+                self._finish(request_id, SERVICE_UNAVAILABLE, None)  # Opened while this request was queued
+                continue
+            try:
+                started = time.perf_counter()
+                if source is None:
+                    audio = self.backend.capture()
+                elif expected_words:
+                    audio = endpointing.listen_for_digits(source, self.recognizer, ring, expected_words)
+                else:
+                    audio = self.recognizer.listen(source)
+                captured = time.perf_counter()
+                with self._lock:
+                    if request_id in self._deadlines:
+                        self._deadlines[request_id] = self._due(captured)
+                metrics.observe("memory_test_listen_seconds", captured - started)
+                if expected_words and hasattr(self.backend, "recognize_expected"):
+                    spoken_text = self.backend.recognize_expected(audio, expected_words)
+                elif expected_words and hasattr(self.backend, "alternatives"):
+                    spoken_text = digit_parser.best_alternative(self.backend.alternatives(audio), expected_words)
+                else:
+                    spoken_text = self.backend.recognize(audio)
+                metrics.observe("memory_test_recognition_seconds", time.perf_counter() - captured, ("backend", self.backend.name))
+            except sr.WaitTimeoutError:
+                self._finish(request_id, NOT_UNDERSTOOD, None)
+            except sr.UnknownValueError:
+                self._finish(request_id, NOT_UNDERSTOOD, None, healthy=True)  # The recognizer answered, it just heard nothing useful
+            except sr.RequestError:
+                self._finish(request_id, SERVICE_ERROR, None, healthy=False)
+            except OSError:
+                self._finish(request_id, MICROPHONE_ERROR, None)
+                raise
+            except Exception as error:
+                # Anything else is a bug in a backend; answer the request and keep serving
+                print(f"Speech recognition failed: {error!r}", file=sys.stderr)
+                self._finish(request_id, SERVICE_ERROR, None, healthy=False)
+            else:
+                self._finish(request_id, RECOGNIZED, spoken_text, healthy=True)
+
+    # Function to answer a queued request unless the game has already given up on it; healthy
+    # tells the circuit breaker whether the recognizer worked (None: the recognizer was not involved)
+    def _finish(self, request_id, status, text, healthy=None):
+        with self._lock:
+            if request_id not in self._deadlines:
+                return
+            del self._deadlines[request_id]
+        if healthy is True:
+            self.breaker.record_success()
+        elif healthy is False:
+            self.breaker.record_failure()
+        self._publish(request_id, status, text)
+
+    # Function to check whether the recognizer answers again, called by the open circuit breaker
+    def _probe(self):
+        try:
+            self.backend.recognize(PROBE_AUDIO)
+        except sr.UnknownValueError:
+            return True  # Silence is not understood, but the service did answer
+        except Exception:
+            return False  # sr.RequestError or a backend bug; either way it is not back yet
+        return True
@@ -0,0 +1,63 @@
+import os
+import re
+import subprocess
+import sys
+import time
+
+# Startup measurement mode. profile_startup() starts the game in a child process under
+# "python -X importtime", stops it as soon as the start screen's first frame is on screen and
+# reports the time to first frame together with the cost of every import on that path.
+
+# Set in the child so the game exits right after its first frame
+FIRST_FRAME_ONLY = "MEMORY_TEST_FIRST_FRAME_ONLY"
+FIRST_FRAME_MARKER = "first-frame"
+
+
+# Function called by the game once the first frame has been presented
+def first_frame_presented():
+    if os.environ.get(FIRST_FRAME_ONLY):
+        print(FIRST_FRAME_MARKER, flush=True)
+        sys.exit(0)
+
+
+# Function to parse "-X importtime" output into (module, self ms, cumulative ms, depth) rows
+def parse_importtime(output):
+    rows = []
+    for line in output.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)", line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us) / 1000, int(cumulative_us) / 1000, (len(indent) - 1) // 2))
+    return rows
+
+
+# Function to run script until its first frame and print the startup report
+def profile_startup(script, top=15):
+    environment = dict(os.environ, **{FIRST_FRAME_ONLY: "1"})
+    started = time.perf_counter()
+    child = subprocess.Popen(
+        [sys.executable, "-X", "importtime", script],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=environment,
+        text=True,
+    )
+    time_to_first_frame = None
+    for line in child.stdout:
+        if line.strip() == FIRST_FRAME_MARKER:
+            time_to_first_frame = time.perf_counter() - started
+            break
+    _, errors = child.communicate()
+
+    if time_to_first_frame is None:
+        print("The game exited before presenting a frame.")
+        print(errors)
+        return
+
+    imports = parse_importtime(errors)
+    top_level = sorted((row for row in imports if row[3] == 0), key=lambda row: row[2], reverse=True)
+    print(f"Time to first frame: {time_to_first_frame * 1000:.0f} ms (including interpreter start)")
+    print(f"Imports before the first frame: {sum(row[1] for row in imports):.0f} ms")
+    print("Most expensive top-level imports (cumulative ms):")
+    for module, _, cumulative, _ in top_level[:top]:
+        print(f"  {cumulative:8.1f}  {module}")
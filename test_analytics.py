@@ -0,0 +1,101 @@
+import numpy as np
+
+import analytics
+import results_store
+
+
+def test_digit_matrix_pads_and_marks_no_answer():
+    data = analytics.from_records(["a", "a"], ["123", "4567"], ["12", None])
+    assert data.sequences.tolist() == [[1, 2, 3, 0], [4, 5, 6, 7]]
+    assert data.responses.tolist() == [[1, 2, 0, 0], [0, 0, 0, 0]]
+    assert data.trial_correct.tolist() == [False, False]
+
+
+def test_non_ascii_digits_count_as_no_answer():
+    data = analytics.from_records(["a", "b"], ["123", "123"], ["1²3", "1٣3"])
+    assert data.responses.tolist() == [[1, 0, 3], [1, 0, 3]]
+    summary = analytics.summarize(data)
+    assert summary["accuracy"] == 0.0
+    assert summary["serial_position_errors"][3] == [0.0, 1.0, 0.0]
+
+
+def test_trial_correct_matches_game_rule():
+    data = analytics.from_records(["a", "a", "a"], ["123", "123", "1234"], ["123", "321", "1234"])
+    assert data.trial_correct.tolist() == [True, False, True]
+
+
+def test_serial_position_errors_per_length():
+    data = analytics.from_records(["a", "a"], ["123", "123"], ["123", "103"])
+    lengths, rates = analytics.serial_position_errors(data)
+    assert lengths.tolist() == [3]
+    assert rates[0].tolist() == [0.0, 0.5, 0.0]
+
+
+def test_confusion_matrix_counts_answered_digits():
+    data = analytics.from_records(["a"], ["123"], ["133"])
+    confusion = analytics.confusion_matrix(data)
+    assert confusion[0, 0] == 1
+    assert confusion[1, 2] == 1  # 2 answered as 3
+    assert confusion[2, 2] == 1
+    assert confusion.sum() == 3
+
+
+def test_span_estimate_from_level_trials():
+    # Length 3 all right, length 4 half right: 2 + 1 + 0.5
+    data = analytics.from_records(["a"] * 4, ["123", "123", "1234", "1234"], ["123", "123", "1234", "1111"])
+    assert analytics.span_estimates(data).tolist() == [3.5]
+
+
+def test_adaptive_trials_use_the_stored_estimate():
+    data = analytics.from_records(["a", "b"], ["123456789", "123"], ["123456789", "123"],
+                                  adaptive=[True, False], adaptive_spans={"a": 7.25})
+    spans = analytics.span_estimates(data)
+    assert spans.tolist() == [7.25, 3.0]
+
+
+def test_participant_without_level_trials_or_estimate_is_left_out():
+    data = analytics.from_records(["a", "b"], ["123", "123"], ["123", "123"], adaptive=[True, False])
+    spans = analytics.span_estimates(data)
+    assert np.isnan(spans[0])
+    summary = analytics.summarize(data)
+    assert list(summary["span_percentiles"]) == ["b"]
+    assert summary["span_mean"] == 3.0
+
+
+def test_empty_data_summarizes():
+    summary = analytics.summarize(analytics.from_records([], [], []))
+    assert summary["trials"] == 0
+    assert summary["accuracy"] is None
+    assert summary["span_mean"] is None
+
+
+def test_load_trials_ignores_estimates_of_aborted_sessions(tmp_path):
+    database = str(tmp_path / "results.db")
+    store = results_store.ResultsStore(database)
+    user = {"email": "a@example.com"}
+    levels = store.start_session(user)
+    for index, (sequence, response) in enumerate([("123", "123"), ("123", "123"), ("1234", "1234"), ("1234", "1111")]):
+        store.record_trial(levels, len(sequence) - 2, index, [int(digit) for digit in sequence], response, sequence == response)
+    store.finish_session(levels, 3, 2)
+    aborted = store.start_session(user)
+    store.finish_session(aborted, 0, None, completed=False, span_estimate=6.5, span_sd=2.0)
+    store.close()
+
+    data = analytics.load_trials(database)
+    assert data.adaptive.tolist() == [False] * 4
+    assert analytics.span_estimates(data).tolist() == [3.5]
+
+
+def test_load_trials_by_presentation(tmp_path):
+    database = str(tmp_path / "results.db")
+    store = results_store.ResultsStore(database)
+    for presentation, response in (("visual", "123"), ("auditory", "100")):
+        session_id = store.start_session({"name": presentation}, presentation=presentation)
+        store.record_trial(session_id, 1, 0, [1, 2, 3], response, response == "123")
+        store.finish_session(session_id, int(response == "123"), 1)
+    store.close()
+
+    assert len(analytics.load_trials(database)) == 2
+    auditory = analytics.load_trials(database, presentation="auditory")
+    assert auditory.user_keys == ["auditory"]
+    assert auditory.trial_correct.tolist() == [False]
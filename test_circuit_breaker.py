@@ -0,0 +1,49 @@
+import threading
+
+import circuit_breaker
+
+
+def test_opens_after_threshold_and_closes_on_a_good_probe():
+    healthy = threading.Event()
+    changes = []
+    closed = threading.Event()
+
+    def on_change(state):
+        changes.append(state)
+        if state == circuit_breaker.CLOSED:
+            closed.set()
+
+    breaker = circuit_breaker.CircuitBreaker(healthy.is_set, failure_threshold=2, probe_interval=0.01, on_change=on_change)
+    breaker.record_failure()
+    breaker.record_success()  # A success resets the count
+    breaker.record_failure()
+    assert not breaker.is_open
+    breaker.record_failure()
+    assert breaker.is_open
+    assert changes == [circuit_breaker.OPEN]
+
+    healthy.set()
+    assert closed.wait(2)
+    assert not breaker.is_open
+    assert breaker.failures == 0
+    assert changes == [circuit_breaker.OPEN, circuit_breaker.CLOSED]
+
+
+def test_a_failing_probe_keeps_it_open():
+    probes = threading.Semaphore(0)
+
+    def probe():
+        probes.release()
+        raise OSError("still down")
+
+    breaker = circuit_breaker.CircuitBreaker(probe, failure_threshold=1, probe_interval=0.01)
+    breaker.record_failure()
+    assert probes.acquire(timeout=2) and probes.acquire(timeout=2)
+    assert breaker.is_open
+
+
+def test_zero_threshold_disables_it():
+    breaker = circuit_breaker.CircuitBreaker(lambda: True, failure_threshold=0)
+    for _ in range(10):
+        breaker.record_failure()
+    assert not breaker.is_open
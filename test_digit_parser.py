@@ -0,0 +1,38 @@
+import digit_parser
+
+
+def test_figures_and_words():
+    assert digit_parser.parse_digits("1 2 3") == "123"
+    assert digit_parser.parse_digits("123") == "123"
+    assert digit_parser.parse_digits("four five six") == "456"
+    assert digit_parser.parse_digits("Seven, eight. Nine!") == "789"
+
+
+def test_homophones():
+    assert digit_parser.parse_digits("won to tree for") == "1234"
+    assert digit_parser.parse_digits("ate oh nein") == "809"
+
+
+def test_repeats():
+    assert digit_parser.parse_digits("double five") == "55"
+    assert digit_parser.parse_digits("one triple two") == "1222"
+
+
+def test_compound_numbers():
+    assert digit_parser.parse_digits("twenty three") == "23"
+    assert digit_parser.parse_digits("forty") == "40"
+    assert digit_parser.parse_digits("thirteen") == "13"
+    assert digit_parser.parse_digits("one hundred and five") == "105"
+    assert digit_parser.parse_digits("three hundred") == "300"
+    assert digit_parser.parse_digits("nine hundred twelve") == "912"
+
+
+def test_filler_is_ignored():
+    assert digit_parser.parse_digits("um it was one uh two") == "12"
+    assert digit_parser.parse_digits("no idea") == ""
+
+
+def test_best_alternative_prefers_the_expected_length():
+    alternatives = ["for to", "4 2 8", "428 1"]
+    assert digit_parser.best_alternative(alternatives, 3) == "4 2 8"
+    assert digit_parser.best_alternative(alternatives, 5) == "for to"
@@ -0,0 +1,34 @@
+import endpointing
+
+
+def test_ring_buffer_keeps_the_latest_audio():
+    ring = endpointing.AudioRingBuffer(8)
+    ring.write(b"abcde")
+    assert ring.read_from(0) == b"abcde"
+    assert ring.read_from(2) == b"cde"
+    ring.write(b"fghij")  # Wraps around and overwrites "ab"
+    assert (ring.size, ring.written) == (8, 10)
+    assert ring.read_from(0) == b"cdefghij"
+    assert ring.read_from(7) == b"hij"
+
+
+def test_ring_buffer_chunk_larger_than_capacity():
+    ring = endpointing.AudioRingBuffer(4)
+    ring.write(b"123456")
+    assert ring.read_from(0) == b"3456"
+    ring.clear()
+    assert ring.read_from(0) == b""
+
+
+def test_detector_stops_after_the_expected_words():
+    detector = endpointing.EndpointDetector(2, seconds_per_chunk=0.05, energy_threshold=100)
+    word, gap = [500] * 4, [0] * 3
+    stopped = [detector.update(energy) for energy in [0] * 5 + word + gap + word + gap + [0] * 2]
+    assert detector.words == 2
+    assert detector.speech_started == 5
+    assert stopped.index(True) == len(stopped) - 1
+
+
+def test_detector_waits_for_speech():
+    detector = endpointing.EndpointDetector(3, seconds_per_chunk=0.05, energy_threshold=100)
+    assert not any(detector.update(0) for _ in range(100))
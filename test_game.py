@@ -0,0 +1,92 @@
+import random
+
+import adaptive
+import game_core
+import game_flow
+
+
+def test_scoring_counts_digits_in_place():
+    assert game_core.count_correct("123", [1, 2, 3]) == 3
+    assert game_core.count_correct("132", [1, 2, 3]) == 1
+    assert game_core.count_correct("12", [1, 2, 3]) == 2
+    assert game_core.is_correct("123", [1, 2, 3])
+    assert not game_core.is_correct("12", [1, 2, 3])
+    assert not game_core.is_correct("", [1, 2, 3])
+
+
+def test_level_rules():
+    assert game_core.sequence_length(1) == game_core.START_LENGTH
+    assert game_core.level_for_length(game_core.sequence_length(4)) == 4
+    assert game_core.level_passed(game_core.PASS_MARK)
+    assert not game_core.level_passed(game_core.PASS_MARK - 1)
+
+
+def play(outcomes, procedure=None):
+    # Answers each trial right or wrong in the order of outcomes
+    outcomes = iter(outcomes)
+    lengths = []
+
+    def answer(sequence):
+        lengths.append(len(sequence))
+        right = "".join(map(str, sequence))
+        return right if next(outcomes) else right[:-1]
+
+    flow = game_flow.GameFlow(lambda length: game_core.generate_sequence(length, random.Random(length)), 0.0, procedure)
+    return game_flow.run_instantly(flow, answer), lengths
+
+
+def test_passing_a_level_lengthens_the_sequence():
+    flow, lengths = play([True, False, True, False, False, False])
+    assert lengths == [3, 3, 3, 4, 4, 4]
+    assert flow.score == 2
+    assert flow.level == 2
+    assert flow.phase == game_flow.FINISHED
+    assert not flow.aborted
+
+
+def test_failing_the_first_level_ends_the_game():
+    flow, lengths = play([False, True, False])
+    assert lengths == [3, 3, 3]
+    assert flow.score == 1
+    assert flow.level == 1
+
+
+def test_phases_follow_the_deadlines():
+    flow = game_flow.GameFlow(lambda length: [1] * length, 0.0)
+    assert flow.phase == game_flow.PRESENT_DIGIT
+    assert flow.time_until_deadline(0.25) == game_flow.DIGIT_DURATION - 0.25
+    assert flow.update(game_flow.DIGIT_DURATION)
+    assert (flow.phase, flow.digit_index) == (game_flow.BLANK, 0)
+    # A late wake-up catches up on every phase that has ended
+    flow.update(100.0)
+    assert flow.phase == game_flow.COLLECT_INPUT
+    assert flow.time_until_deadline(100.0) is None
+    flow.submit_input("111", 100.0)
+    assert flow.phase == game_flow.FEEDBACK
+    assert flow.last_correct and flow.score == 1
+
+
+def test_adaptive_game_ends_with_an_estimate():
+    # Getting everything right drives the estimate above the prior
+    procedure = adaptive.QuestProcedure()
+    flow, lengths = play([True] * adaptive.MAX_TRIALS, procedure)
+    assert adaptive.MIN_TRIALS <= len(lengths) <= adaptive.MAX_TRIALS
+    assert flow.span_estimate > adaptive.PRIOR_MEAN
+    assert flow.span_sd < adaptive.PRIOR_SD
+
+
+def test_adaptive_estimate_follows_the_answers():
+    procedure = adaptive.QuestProcedure()
+    span = 5
+    while not procedure.finished:
+        length = procedure.next_length()
+        procedure.record(length, length <= span)
+    assert abs(procedure.estimate() - span) < 1.5
+    assert procedure.standard_deviation() < adaptive.STOP_SD or len(procedure.trials) == adaptive.MAX_TRIALS
+
+
+def test_span_estimate_waits_for_a_trial():
+    flow = game_flow.GameFlow(lambda length: [1] * length, 0.0, adaptive.QuestProcedure())
+    assert flow.span_estimate is None
+    assert flow.span_sd is None
+    assert game_flow.GameFlow(lambda length: [1] * length, 0.0).span_estimate is None
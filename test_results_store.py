@@ -0,0 +1,56 @@
+import results_store
+
+USER = {"name": "Test User", "email": "test@example.com"}
+
+
+def open_store(tmp_path):
+    return results_store.ResultsStore(str(tmp_path / "results.db"), station="test")
+
+
+def test_session_and_trials_round_trip(tmp_path):
+    store = open_store(tmp_path)
+    session_id = store.start_session(USER)
+    store.record_trial(session_id, 1, 0, [1, 2, 3], "123", True)
+    store.record_trial(session_id, 1, 1, [4, 5, 6], "450", False)
+    store.finish_session(session_id, 1, 1)
+    store.flush()
+
+    trials = store.session_trials(session_id)
+    assert [(level, index, sequence, response, correct) for level, index, sequence, response, correct, _ in trials] == [
+        (1, 0, "123", "123", 1),
+        (1, 1, "456", "450", 0),
+    ]
+    (history,) = store.user_history(USER)
+    assert history[0] == session_id
+    assert history[3:6] == (1, 1, 1)
+    store.close()
+
+
+def test_presentation_timing_is_saved_with_the_session(tmp_path):
+    store = open_store(tmp_path)
+    session_id = store.start_session(USER)
+    timing = {"digits": 3, "onset_error_mean_ms": 0.4, "jitter_sd_ms": 0.1, "timing": "measured"}
+    store.finish_session(session_id, 0, 1, presentation_timing=timing)
+    store.flush()
+    assert store.presentation_timing(session_id) == timing
+
+    other = store.start_session(USER)
+    store.finish_session(other, 0, 1)
+    store.flush()
+    assert store.presentation_timing(other) is None
+    store.close()
+
+
+def test_a_failing_write_loses_only_itself(tmp_path, capsys):
+    store = open_store(tmp_path)
+    session_id = store.start_session(USER)
+    store.record_trial(session_id, 1, 0, [1, 2, 3], "123", True)
+    store.finish_session(session_id, 1, 1, presentation_timing={"timing": object()})  # Not JSON
+    store.record_trial(session_id, 1, 1, [4, 5, 6], "456", True)
+    store.flush()
+
+    assert [trial[1] for trial in store.session_trials(session_id)] == [0, 1]
+    (history,) = store.user_history(USER)
+    assert history[2] is None  # The session was never finished
+    assert "Could not save finish result" in capsys.readouterr().err
+    store.close()
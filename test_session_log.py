@@ -0,0 +1,110 @@
+import os
+import threading
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+import pytest
+
+import game_core
+import game_flow
+import game_loop
+import memory_test
+import session_log
+
+# Whether the player gets each trial right; two levels' worth, ending in game over
+ANSWERS_CORRECT = [True, False, True, False, False, False]
+
+
+@pytest.fixture
+def game(monkeypatch):
+    if memory_test.screen is None:
+        memory_test.init_display()
+    # Short phases keep the session quick while every deadline still lands between real events
+    monkeypatch.setattr(game_flow, "DIGIT_DURATION", 0.03)
+    monkeypatch.setattr(game_flow, "BLANK_DURATION", 0.02)
+    monkeypatch.setattr(game_flow, "FEEDBACK_DURATION", 0.04)
+    monkeypatch.setattr(game_flow, "LEVEL_COMPLETE_DURATION", 0.04)
+    monkeypatch.setattr(game_flow, "GAME_OVER_DURATION", 0.04)
+    display_message_for = memory_test.display_message_for
+    monkeypatch.setattr(memory_test, "display_message_for",
+                        lambda message, color, duration_ms: display_message_for(message, color, duration_ms / 50))
+
+    # No speech stack: every answer is typed
+    no_speech = threading.Thread(target=lambda: None)
+    no_speech.start()
+    monkeypatch.setattr(memory_test, "speech", None)
+    monkeypatch.setattr(memory_test, "speech_thread", no_speech)
+
+    # The player types each answer as soon as the prompt appears (only while recording; a replay
+    # takes the keys from the log)
+    sequences = []
+    generate_sequence = memory_test.generate_sequence
+    get_player_typing_input = memory_test.get_player_typing_input
+
+    def remember_sequence(length):
+        sequences.append(generate_sequence(length))
+        return sequences[-1]
+
+    def type_answer(length):
+        if game_loop.replayer is None:
+            sequence = sequences[-1]
+            if not ANSWERS_CORRECT[len(sequences) - 1]:
+                sequence = [digit % 9 + 1 for digit in sequence]
+            for digit in sequence:
+                pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_0 + digit, mod=0, unicode=str(digit)))
+            pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_RETURN, mod=0, unicode="\r"))
+        return get_player_typing_input(length)
+
+    monkeypatch.setattr(memory_test, "generate_sequence", remember_sequence)
+    monkeypatch.setattr(memory_test, "get_player_typing_input", type_answer)
+    pygame.event.clear()
+    return sequences
+
+
+def record_session(directory, monkeypatch):
+    monkeypatch.setenv("MEMORY_TEST_RECORD_DIR", str(directory))
+    score = memory_test.memory_test({}, seed=1234)
+    monkeypatch.delenv("MEMORY_TEST_RECORD_DIR")
+    (name,) = os.listdir(directory)
+    return score, os.path.join(directory, name)
+
+
+def test_replay_repeats_recorded_session(game, tmp_path, monkeypatch):
+    score, path = record_session(tmp_path, monkeypatch)
+    assert len(game) == len(ANSWERS_CORRECT)
+    assert score == ANSWERS_CORRECT.count(True)
+
+    # The replay takes every decision at its recorded time, so it never runs ahead of the log
+    for _ in range(3):
+        replayed_score, seconds = session_log.replay(path)
+        assert replayed_score == score
+
+
+def test_log_holds_header_batches_and_clock_readings(game, tmp_path, monkeypatch):
+    score, path = record_session(tmp_path, monkeypatch)
+    header, batches, speech, clocks = session_log.read_log(path)
+    assert header["mode"] == "levels"
+    assert header["seed"] == 1234
+    assert speech == []
+    assert clocks == sorted(clocks)
+    typed = [event.unicode for _, _, events in batches for event in events if event.type == pygame.KEYDOWN]
+    assert typed.count("\r") == len(ANSWERS_CORRECT)
+
+
+def test_truncated_log_ends_the_replay(game, tmp_path, monkeypatch):
+    score, path = record_session(tmp_path, monkeypatch)
+    with open(path, "rb") as log:
+        data = log.read()
+    with open(path, "wb") as log:
+        log.write(data[:len(data) // 2])
+    replayed_score, seconds = session_log.replay(path)
+    assert 0 <= replayed_score <= score
+
+
+def test_replay_of_a_different_game_diverges(game, tmp_path, monkeypatch):
+    score, path = record_session(tmp_path, monkeypatch)
+    monkeypatch.setattr(game_core, "START_LENGTH", game_core.START_LENGTH + 1)  # Longer sequences than recorded
+    with pytest.raises(session_log.ReplayDiverged):
+        session_log.replay(path)